@@ -0,0 +1,194 @@
+"""Admission control: pre-flight cost estimation and load shedding."""
+import math
+import threading
+import time
+from collections import deque
+from results import CostEstimate, PipelineError
+from summarizer import cached_tokens
+
+# Rough tokenizer ratio for English transcript text
+CHARS_PER_TOKEN = 4
+
+# Fixed prompt tokens (system message, schema, instructions) per call
+CHUNK_PROMPT_OVERHEAD_TOKENS = 250
+SYNTHESIS_PROMPT_OVERHEAD_TOKENS = 300
+
+# Starting points for the running averages, replaced by observed values
+DEFAULT_LATENCY_SECONDS = {"map": 8.0, "synthesis": 12.0}
+DEFAULT_COMPLETION_TOKENS = {"map": 400, "synthesis": 700}
+
+# Weight of the newest observation in the running averages
+EWMA_ALPHA = 0.2
+
+
+class AdmissionController:
+    """
+    Decide whether to accept, queue or reject a prepared job before any LLM call.
+
+    Estimates a job's token cost and duration from its chunks, then compares
+    them with the scheduler's backlog, the token budget left in the trailing
+    minute and any recent upstream rate limiting.
+    """
+
+    def __init__(self, scheduler, tokens_per_minute=200000, queue_after_seconds=60.0,
+                 reject_after_seconds=600.0):
+        self.scheduler = scheduler
+        self.tokens_per_minute = tokens_per_minute
+        self.queue_after_seconds = queue_after_seconds
+        self.reject_after_seconds = reject_after_seconds
+        self._lock = threading.Lock()
+        self._latency = dict(DEFAULT_LATENCY_SECONDS)
+        self._completion_tokens = dict(DEFAULT_COMPLETION_TOKENS)
+        self._spent = deque()  # (timestamp, tokens) within the trailing minute
+        self._rate_limited_until = 0.0
+        self._usage = {}  # Per-stage totals since startup, for prompt cache accounting
+        scheduler.add_finish_listener(self.record_job)
+
+    def record_usage(self, stage, usage, elapsed):
+        """Usage listener: track spend and per-stage latency/output size."""
+        with self._lock:
+            self._latency[stage] = _ewma(self._latency.get(stage, elapsed), elapsed)
+            if usage is not None:
+                self._spent.append((time.time(), getattr(usage, "total_tokens", 0) or 0))
+                completion = getattr(usage, "completion_tokens", None)
+                if completion:
+                    self._completion_tokens[stage] = _ewma(self._completion_tokens.get(stage, completion), completion)
+                cached = cached_tokens(usage)
+                totals = self._usage.setdefault(stage, dict.fromkeys(
+                    ("calls", "cached_calls", "prompt_tokens", "cached_tokens", "completion_tokens",
+                     "seconds", "cached_seconds"), 0))
+                totals["calls"] += 1
+                totals["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+                totals["completion_tokens"] += completion or 0
+                totals["cached_tokens"] += cached
+                totals["seconds"] += elapsed
+                if cached:
+                    totals["cached_calls"] += 1
+                    totals["cached_seconds"] += elapsed
+
+    def usage_summary(self):
+        """
+        Per-stage token usage and prompt cache effectiveness since startup.
+
+        Returns:
+            Dict of stage -> totals plus cache_hit_rate (share of prompt tokens
+            served from cache) and mean latency of calls with and without a hit
+        """
+        summary = {}
+        with self._lock:
+            for stage, totals in self._usage.items():
+                uncached_calls = totals["calls"] - totals["cached_calls"]
+                summary[stage] = {
+                    **{key: value for key, value in totals.items() if not key.endswith("seconds")},
+                    "cache_hit_rate": round(totals["cached_tokens"] / max(totals["prompt_tokens"], 1), 3),
+                    "mean_seconds_cached": round(totals["cached_seconds"] / max(totals["cached_calls"], 1), 2),
+                    "mean_seconds_uncached": round((totals["seconds"] - totals["cached_seconds"])
+                                                   / max(uncached_calls, 1), 2),
+                }
+        return summary
+
+    def record_job(self, job):
+        """Finish listener: back off new admissions after upstream rate limiting."""
+        if isinstance(job.result, PipelineError) and job.result.error_code == "api_rate_limit":
+            with self._lock:
+                self._rate_limited_until = time.time() + 60.0
+
+    def _spent_last_minute(self):
+        """Tokens used in the trailing minute (lock held)."""
+        cutoff = time.time() - 60.0
+        while self._spent and self._spent[0][0] < cutoff:
+            self._spent.popleft()
+        return sum(tokens for _, tokens in self._spent)
+
+    def _tokens_for(self, chunk_count, chunk_chars):
+        """Estimated (prompt, completion) tokens for a job (lock held)."""
+        prompt = chunk_chars // CHARS_PER_TOKEN + CHUNK_PROMPT_OVERHEAD_TOKENS * chunk_count
+        prompt += int(self._completion_tokens["map"] * chunk_count) + SYNTHESIS_PROMPT_OVERHEAD_TOKENS
+        completion = int(self._completion_tokens["map"] * chunk_count + self._completion_tokens["synthesis"])
+        return prompt, completion
+
+    def estimate(self, prepared, deadline=None):
+        """
+        Estimate cost and duration of a prepared job and decide on admission.
+
+        Args:
+            prepared: PreparedTranscript from main.prepare_transcript
+            deadline: Request Deadline; jobs that cannot finish within it are queued
+
+        Returns:
+            CostEstimate with decision "accept", "queue" or "reject"
+        """
+        stats = self.scheduler.stats()
+        chunk_count = len(prepared.chunks)
+        chunk_chars = sum(len(chunk["text"]) for chunk in prepared.chunks)
+        workers = max(stats["workers"], 1)
+
+        with self._lock:
+            prompt_tokens, completion_tokens = self._tokens_for(chunk_count, chunk_chars)
+            map_latency = self._latency["map"]
+            service = math.ceil(chunk_count / workers) * map_latency + self._latency["synthesis"]
+            queue_wait = stats["pending_calls"] / workers * map_latency
+
+            # Tokens already committed to queued work count against the budget
+            reserved = stats["pending_chars"] // CHARS_PER_TOKEN
+            quota_remaining = max(self.tokens_per_minute - self._spent_last_minute() - reserved, 0)
+            rate_limited_for = max(self._rate_limited_until - time.time(), 0.0)
+
+        total_tokens = prompt_tokens + completion_tokens
+        quota_wait = 0.0
+        if total_tokens > quota_remaining:
+            quota_wait = 60.0 * (total_tokens - quota_remaining) / max(self.tokens_per_minute, 1)
+        wait = max(queue_wait, quota_wait, rate_limited_for)
+
+        estimate = CostEstimate(
+            video_id=prepared.video_id,
+            chunks_count=chunk_count,
+            transcript_chars=len(prepared.transcript_text),
+            llm_calls=chunk_count + 1,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=total_tokens,
+            service_seconds=round(service, 1),
+            queue_wait_seconds=round(wait, 1),
+            eta_seconds=round(wait + service, 1),
+            quota_remaining_tokens=quota_remaining,
+        )
+
+        if rate_limited_for > 0:
+            estimate.decision = "reject"
+            estimate.reason = "rate_limited"
+        elif wait > self.reject_after_seconds:
+            estimate.decision = "reject"
+            estimate.reason = "quota" if quota_wait >= queue_wait else "capacity"
+        else:
+            limit = self.queue_after_seconds
+            remaining = deadline.remaining() if deadline is not None else None
+            if remaining is not None:
+                limit = min(limit, remaining)
+            if wait + service > limit:
+                estimate.decision = "queue"
+        if estimate.decision == "reject":
+            estimate.retry_after_seconds = round(max(wait - self.reject_after_seconds, rate_limited_for, 1.0), 1)
+        return estimate
+
+    def job_eta(self, job):
+        """Estimated seconds until an already submitted job finishes."""
+        workers = max(self.scheduler.workers, 1)
+        with self._lock:
+            eta = math.ceil(job.pending_calls() / workers) * self._latency["map"]
+            if not job.synthesis_started:
+                eta += self._latency["synthesis"]
+        return round(eta, 1)
+
+
+def rejection_error(estimate):
+    """Build the PipelineError returned to a rejected client."""
+    if estimate.reason in ("rate_limited", "quota"):
+        return PipelineError("api_rate_limit", "Upstream rate limit or token quota nearly exhausted; retry later.",
+                             retry_after=estimate.retry_after_seconds)
+    return PipelineError("overloaded", "Server is at capacity; retry later.",
+                         retry_after=estimate.retry_after_seconds)
+
+
+def _ewma(current, observed):
+    return current + EWMA_ALPHA * (observed - current)
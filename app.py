@@ -1,10 +1,21 @@
 """Flask web application for YouTube Summarizer Pipeline."""
-from flask import Flask, render_template_string, request, jsonify
-import json
+from flask import Flask, Response, render_template_string, request
 import traceback
-from main import process_youtube_url
+from main import prepare_transcript
+from results import PipelineError, QueuedJob, dumps
+from scheduler import FairScheduler
+from admission import AdmissionController, rejection_error
+from summarizer import add_usage_listener
+from deadline import Deadline
+from tracing import start_trace, profile
+from library import get_library
+from config import get_scheduler_settings, get_admission_settings, get_request_deadline, get_trusted_frontends
 
 app = Flask(__name__)
+scheduler = FairScheduler(**get_scheduler_settings())
+admission = AdmissionController(scheduler, **get_admission_settings())
+add_usage_listener(admission.record_usage)
+trusted_frontends = get_trusted_frontends()
 
 # HTML template
 HTML_TEMPLATE = """
@@ -310,7 +321,14 @@ HTML_TEMPLATE = """
                     body: JSON.stringify({ url: url })
                 });
 
-                const data = await response.json();
+                let data = await response.json();
+                
+                // Long jobs are queued; poll until the result is ready
+                while (data.status === 'queued') {
+                    showStatus('Queued... estimated ' + Math.ceil(data.eta_seconds) + 's remaining.', 'info');
+                    await new Promise(resolve => setTimeout(resolve, 3000));
+                    data = await (await fetch('/api/jobs/' + data.job_id)).json();
+                }
                 
                 if (data.status === 'error') {
                     displayError(data);
@@ -331,6 +349,35 @@ HTML_TEMPLATE = """
 """
 
 
+def json_response(result, status=200):
+    """Serialize a pipeline result object once, at the HTTP edge."""
+    response = Response(result.to_json(), status=status, mimetype='application/json')
+    retry_after = getattr(result, 'retry_after', None)
+    if retry_after is not None:
+        response.headers['Retry-After'] = str(max(int(retry_after), 1))
+    return response
+
+
+def read_url():
+    """Read the URL from the JSON body, or None if missing."""
+    data = request.get_json(silent=True) or {}
+    return data.get('url', '').strip() or None
+
+
+def get_client_id():
+    """
+    Identify the caller for per-client fair scheduling.
+
+    Callers are keyed on their remote address, which they cannot choose.
+    X-Client-Id is only honoured from TRUSTED_FRONTENDS, so a caller cannot
+    rotate IDs for extra fair shares or claim a weighted ID.
+    """
+    remote = request.remote_addr or 'anonymous'
+    if remote in trusted_frontends:
+        return request.headers.get('X-Client-Id') or remote
+    return remote
+
+
 @app.route('/')
 def index():
     """Render the main page."""
@@ -340,35 +387,98 @@ def index():
 @app.route('/api/summarize', methods=['POST'])
 def summarize():
     """API endpoint to summarize YouTube video."""
+    # Each request is one trace; "X-Profile: 1" also writes a cProfile dump
+    with start_trace("POST /api/summarize", client_id=get_client_id()) as root:
+        with profile(request.headers.get('X-Profile') == '1', root.trace_id):
+            response = _summarize()
+        root.set_attribute("http.status_code", response.status_code)
+    response.headers['X-Trace-Id'] = root.trace_id
+    return response
+
+
+def _summarize():
+    """Run admission and the pipeline for one /api/summarize request."""
     try:
-        data = request.get_json()
-        url = data.get('url', '').strip()
+        url = read_url()
         
         if not url:
-            return jsonify({
-                "status": "error",
-                "error_code": "invalid_url",
-                "message": "Input is not a valid YouTube URL."
-            }), 400
+            return json_response(PipelineError("invalid_url", "Input is not a valid YouTube URL."), 400)
+        
+        # One time budget for every stage of this request
+        deadline = Deadline(get_request_deadline())
         
-        # Process the URL through the pipeline
-        result_json = process_youtube_url(url)
-        result = json.loads(result_json)
+        # Fetch, clean and chunk, then hand the LLM stages to the scheduler
+        prepared = prepare_transcript(url, deadline)
+        if isinstance(prepared, PipelineError):
+            return json_response(prepared)
         
-        return jsonify(result)
+        # Decide before spending any tokens whether the job can finish in time
+        estimate = admission.estimate(prepared, deadline)
+        if estimate.decision == "reject":
+            error = rejection_error(estimate)
+            return json_response(error, 429 if error.error_code == "api_rate_limit" else 503)
+        if estimate.decision == "queue":
+            # Background jobs get a fresh budget on top of their expected wait
+            job_deadline = Deadline(estimate.eta_seconds + get_request_deadline())
+            job = scheduler.submit(get_client_id(), prepared, job_deadline)
+            return json_response(QueuedJob(job.job_id, estimate.eta_seconds), 202)
         
-    except json.JSONDecodeError as e:
-        return jsonify({
-            "status": "error",
-            "error_code": "unknown_error",
-            "message": f"Invalid JSON response: {str(e)}"
-        }), 500
+        result = scheduler.run(get_client_id(), prepared, deadline)
+        
+        return json_response(result)
+        
+    except Exception as e:
+        return json_response(PipelineError("unknown_error", f"Unexpected error: {str(e)}"), 500)
+
+
+@app.route('/api/estimate', methods=['POST'])
+def estimate():
+    """API endpoint returning the pre-flight cost estimate and admission decision."""
+    try:
+        url = read_url()
+        
+        if not url:
+            return json_response(PipelineError("invalid_url", "Input is not a valid YouTube URL."), 400)
+        
+        prepared = prepare_transcript(url)
+        if isinstance(prepared, PipelineError):
+            return json_response(prepared)
+        
+        return json_response(admission.estimate(prepared))
+        
+    except Exception as e:
+        return json_response(PipelineError("unknown_error", f"Unexpected error: {str(e)}"), 500)
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """API endpoint to poll a queued job."""
+    job = scheduler.get(job_id)
+    if job is None:
+        return json_response(PipelineError("unknown_job", "No such job."), 404)
+    if not job.done.is_set():
+        return json_response(QueuedJob(job.job_id, admission.job_eta(job)), 202)
+    return json_response(job.result)
+
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """API endpoint reporting scheduler load and per-stage token usage, including prompt cache hits."""
+    data = {"scheduler": scheduler.stats(), "usage": admission.usage_summary()}
+    return Response(dumps(data), mimetype='application/json')
+
+
+@app.route('/api/search', methods=['GET'])
+def search():
+    """API endpoint to search the library of summarized videos."""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return json_response(PipelineError("invalid_query", "Missing search query parameter q."), 400)
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    try:
+        return json_response(get_library().search(query, limit))
     except Exception as e:
-        return jsonify({
-            "status": "error",
-            "error_code": "unknown_error",
-            "message": f"Unexpected error: {str(e)}"
-        }), 500
+        return json_response(PipelineError("unknown_error", f"Search failed: {str(e)}"), 500)
 
 
 if __name__ == '__main__':
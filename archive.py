@@ -0,0 +1,315 @@
+"""Memory-mapped columnar transcript archive for bulk reprocessing."""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from chunker import chunk_transcript
+from transcript_extractor import clean_transcript, get_fetcher, TranscriptFetchError
+from results import dumps
+
+MAGIC = b"YTARCH01"
+
+# Footer: index offset, video count, magic
+FOOTER = struct.Struct("<QQ8s")
+
+# Global index, sorted by video ID for binary search. Per video, the record
+# at `offset` holds `count` float64 starts, `count + 1` uint64 byte offsets
+# into the text blob, then the UTF-8 blob of all snippet texts.
+INDEX_DTYPE = np.dtype([("video_id", "S16"), ("offset", "<u8"), ("count", "<u8"), ("text_bytes", "<u8")])
+
+# Videos per task sent to a reprocessing worker
+BATCH_SIZE = 256
+
+
+def _align(size):
+    """Padding that keeps every array 8-byte aligned."""
+    return -size % 8
+
+
+class ArchivedSnippet:
+    """One transcript snippet; has the .start/.text shape clean_transcript expects."""
+    __slots__ = ("start", "text")
+
+    def __init__(self, start, text):
+        self.start = start
+        self.text = text
+
+
+class ArchivedTranscript:
+    """
+    Read-only view of one video's snippets inside the mapped archive.
+
+    The start and offset arrays are numpy views on the mapping; snippet
+    texts are decoded straight from the mapped blob only when iterated.
+    """
+    __slots__ = ("video_id", "starts", "offsets", "blob")
+
+    def __init__(self, video_id, starts, offsets, blob):
+        self.video_id = video_id
+        self.starts = starts
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        blob = self.blob
+        bounds = self.offsets.tolist()
+        for position, start in enumerate(self.starts.tolist()):
+            yield ArchivedSnippet(start, str(blob[bounds[position]:bounds[position + 1]], "utf-8"))
+
+
+class TranscriptArchive:
+    """
+    Memory-mapped archive opened for reading; look videos up by ID or position.
+
+    Raises ValueError if the file is not an archive or was truncated.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < len(MAGIC) + FOOTER.size:
+                raise ValueError(f"{self.path} is not a transcript archive (or is truncated)")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        index_offset, count, magic = FOOTER.unpack_from(self._mmap, size - FOOTER.size)
+        if (magic != MAGIC or self._mmap[:len(MAGIC)] != MAGIC
+                or index_offset + count * INDEX_DTYPE.itemsize > size - FOOTER.size):
+            self.close()
+            raise ValueError(f"{self.path} is not a transcript archive (or is truncated)")
+        self.index = np.frombuffer(self._mmap, dtype=INDEX_DTYPE, count=count, offset=index_offset)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, video_id):
+        return self._position(video_id) is not None
+
+    def video_ids(self):
+        return [video_id.decode("ascii") for video_id in self.index["video_id"]]
+
+    def _position(self, video_id):
+        key = video_id.encode("ascii")
+        position = int(np.searchsorted(self.index["video_id"], key))
+        if position < len(self.index) and self.index["video_id"][position] == key:
+            return position
+        return None
+
+    def get(self, video_id):
+        """Return the ArchivedTranscript for a video, or None if it is not archived."""
+        position = self._position(video_id)
+        return None if position is None else self.at(position)
+
+    def at(self, position):
+        """Return the ArchivedTranscript at an index position."""
+        entry = self.index[position]
+        offset, count = int(entry["offset"]), int(entry["count"])
+        starts = np.frombuffer(self._mmap, dtype="<f8", count=count, offset=offset)
+        offset += count * 8
+        offsets = np.frombuffer(self._mmap, dtype="<u8", count=count + 1, offset=offset)
+        offset += (count + 1) * 8
+        blob = self._view[offset:offset + int(entry["text_bytes"])]
+        return ArchivedTranscript(entry["video_id"].decode("ascii"), starts, offsets, blob)
+
+    def close(self):
+        """Unmap the archive; if transcript views are still alive, the mapping is freed with them."""
+        self.index = None
+        try:
+            self._view.release()
+            self._mmap.close()
+        except BufferError:
+            pass
+
+
+class ArchiveWriter:
+    """Write a new archive: add videos one at a time, then close() writes the index."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC)
+        self._entries = {}
+
+    def add(self, video_id, snippets):
+        """
+        Append one video's snippets (objects with .start/.text or dicts).
+
+        Adding a video ID again replaces the earlier entry in the index.
+        """
+        if len(video_id.encode("ascii")) > INDEX_DTYPE["video_id"].itemsize:
+            raise ValueError(f"Video ID too long: {video_id}")
+        starts, texts = [], []
+        for entry in snippets:
+            if hasattr(entry, "start"):
+                starts.append(entry.start)
+                texts.append(str(entry.text).encode("utf-8"))
+            else:
+                starts.append(entry.get("start", 0))
+                texts.append(entry.get("text", "").encode("utf-8"))
+        offsets = np.zeros(len(texts) + 1, dtype="<u8")
+        offsets[1:] = np.cumsum([len(text) for text in texts])
+        blob = b"".join(texts)
+
+        position = self._file.tell()
+        position += _align(position)
+        self._file.seek(position)
+        self._file.write(np.asarray(starts, dtype="<f8").tobytes())
+        self._file.write(offsets.tobytes())
+        self._file.write(blob)
+        self._entries[video_id] = (position, len(texts), len(blob))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        position = self._file.tell()
+        position += _align(position)
+        self._file.seek(position)
+        index = np.array([(video_id.encode("ascii"), *entry) for video_id, entry in sorted(self._entries.items())],
+                         dtype=INDEX_DTYPE)
+        self._file.write(index.tobytes())
+        self._file.write(FOOTER.pack(position, len(index), MAGIC))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Archive opened once per reprocessing worker process
+_worker_archive = None
+
+
+def _open_worker_archive(path):
+    global _worker_archive
+    _worker_archive = TranscriptArchive(path)
+
+
+def _reprocess_batch(start, stop, target_chars, overlap_chars, keep_chunks):
+    """Clean and chunk archive positions [start, stop) in a worker process."""
+    results = []
+    for position in range(start, stop):
+        transcript = _worker_archive.at(position)
+        text = clean_transcript(transcript)
+        chunks = chunk_transcript(text, target_chars, overlap_chars)
+        results.append((transcript.video_id, len(text), chunks if keep_chunks else len(chunks)))
+    return results
+
+
+def reprocess(path, target_chars=12000, overlap_chars=300, workers=None, output=None):
+    """
+    Re-clean and re-chunk every archived transcript on a process pool.
+
+    Each worker maps the archive itself, so only batch bounds and results
+    cross process boundaries.
+
+    Args:
+        path: Archive path
+        target_chars: Chunk size passed to chunk_transcript
+        overlap_chars: Chunk overlap passed to chunk_transcript
+        workers: Worker processes (default: all cores)
+        output: Optional file object receiving one JSON line of chunks per video
+
+    Returns:
+        Dict with videos, chunks, transcript_chars and seconds
+    """
+    started = time.perf_counter()
+    archive = TranscriptArchive(path)
+    count = len(archive)
+    archive.close()
+
+    totals = {"videos": 0, "chunks": 0, "transcript_chars": 0}
+    bounds = [(start, min(start + BATCH_SIZE, count)) for start in range(0, count, BATCH_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_open_worker_archive,
+                             initargs=(str(path),)) as pool:
+        futures = [pool.submit(_reprocess_batch, start, stop, target_chars, overlap_chars, output is not None)
+                   for start, stop in bounds]
+        for future in futures:
+            for video_id, chars, chunks in future.result():
+                totals["videos"] += 1
+                totals["transcript_chars"] += chars
+                if output is not None:
+                    output.write(dumps({"video_id": video_id, "chunks": chunks}) + "\n")
+                    chunks = len(chunks)
+                totals["chunks"] += chunks
+    totals["seconds"] = round(time.perf_counter() - started, 2)
+    return totals
+
+
+def pack(path, json_dir=None, video_ids=()):
+    """
+    Build an archive from raw snippet JSON files and/or freshly fetched transcripts.
+
+    Args:
+        path: Archive to create (overwritten)
+        json_dir: Directory of <video_id>.json files, each a list of {"start", "text", ...}
+        video_ids: Video IDs to fetch from YouTube
+
+    Returns:
+        Number of archived videos
+    """
+    with ArchiveWriter(path) as writer:
+        if json_dir is not None:
+            for file in sorted(Path(json_dir).glob("*.json")):
+                with open(file, encoding="utf-8") as f:
+                    writer.add(file.stem, json.load(f))
+
+        fetcher = get_fetcher() if video_ids else None
+        if fetcher is not None:
+            fetcher.prefetch(video_ids)
+        for video_id in video_ids:
+            try:
+                snippets = fetcher.fetch(video_id)
+            except TranscriptFetchError as e:
+                print(f"Skipping {video_id}: {e}", file=sys.stderr)
+                continue
+            if snippets is None:
+                print(f"Skipping {video_id}: no transcript", file=sys.stderr)
+                continue
+            writer.add(video_id, snippets)
+        return len(writer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Columnar transcript archive for bulk reprocessing")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    pack_parser = commands.add_parser("pack", help="Build an archive")
+    pack_parser.add_argument("archive")
+    pack_parser.add_argument("--from-json", metavar="DIR", help="Directory of <video_id>.json raw snippet files")
+    pack_parser.add_argument("--fetch", nargs="+", default=[], metavar="VIDEO_ID", help="Video IDs to fetch")
+
+    reprocess_parser = commands.add_parser("reprocess", help="Re-clean and re-chunk every archived transcript")
+    reprocess_parser.add_argument("archive")
+    reprocess_parser.add_argument("--target-chars", type=int, default=12000)
+    reprocess_parser.add_argument("--overlap-chars", type=int, default=300)
+    reprocess_parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    reprocess_parser.add_argument("--output", help="Write chunks as JSON lines to this file")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "pack":
+        print(f"Archived {pack(args.archive, args.from_json, args.fetch)} videos")
+    else:
+        output = open(args.output, "w", encoding="utf-8") if args.output else None
+        try:
+            totals = reprocess(args.archive, args.target_chars, args.overlap_chars, args.workers, output)
+        finally:
+            if output is not None:
+                output.close()
+        print(dumps(totals, indent=True))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
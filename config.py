@@ -24,3 +24,91 @@ def get_openai_api_key():
             pass
     return api_key
 
+
+
+def _parse_weights(value):
+    """Parse "client=weight,client=weight" into a dict."""
+    weights = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        client_id, weight = item.split('=', 1)
+        try:
+            weights[client_id.strip()] = float(weight)
+        except ValueError:
+            continue
+    return weights
+
+
+def get_scheduler_settings():
+    """Get web API scheduler settings from environment."""
+    return {
+        "workers": int(os.getenv('SCHEDULER_WORKERS', '4')),
+        "per_client_jobs": int(os.getenv('SCHEDULER_PER_CLIENT_JOBS', '2')),
+        "weights": _parse_weights(os.getenv('SCHEDULER_CLIENT_WEIGHTS')),
+    }
+
+
+def get_trusted_frontends():
+    """Get addresses of frontends allowed to name clients with X-Client-Id."""
+    return {addr.strip() for addr in os.getenv('TRUSTED_FRONTENDS', '').split(',') if addr.strip()}
+
+
+def get_admission_settings():
+    """Get admission control settings from environment."""
+    return {
+        "tokens_per_minute": int(os.getenv('OPENAI_TOKENS_PER_MINUTE', '200000')),
+        "queue_after_seconds": float(os.getenv('ADMISSION_QUEUE_AFTER_SECONDS', '60')),
+        "reject_after_seconds": float(os.getenv('ADMISSION_REJECT_AFTER_SECONDS', '600')),
+    }
+
+
+def get_queue_url():
+    """Get the worker job queue location from environment."""
+    return os.getenv('JOB_QUEUE_URL', f"sqlite:///{PROJECT_ROOT / 'jobs.db'}")
+
+
+def get_request_deadline():
+    """Get the per-request time budget in seconds from environment."""
+    return float(os.getenv('REQUEST_DEADLINE_SECONDS', '300'))
+
+
+def get_hedging_enabled():
+    """Whether slow LLM calls get a hedged duplicate request."""
+    return os.getenv('HEDGE_REQUESTS', '0').lower() in ('1', 'true', 'yes')
+
+
+def get_fetcher_settings():
+    """Get transcript fetcher settings from environment."""
+    languages = [code.strip() for code in os.getenv('TRANSCRIPT_LANGUAGES', 'en').split(',') if code.strip()]
+    return {
+        "languages": languages or ['en'],
+        "concurrency": int(os.getenv('FETCH_CONCURRENCY', '4')),
+        "fetch_workers": int(os.getenv('FETCH_WORKERS', '32')),
+        "retries": int(os.getenv('FETCH_RETRIES', '3')),
+        "backoff": float(os.getenv('FETCH_BACKOFF_SECONDS', '0.5')),
+        "prefetch_ttl": float(os.getenv('PREFETCH_TTL_SECONDS', '300')),
+        # Offline stand-in: serve YouTube responses from, or record them to, a cassette file
+        "replay_file": os.getenv('TRANSCRIPT_REPLAY_FILE'),
+        "record_file": os.getenv('TRANSCRIPT_RECORD_FILE'),
+    }
+
+
+def get_routing_settings():
+    """Get per-stage model routing policy from environment."""
+    return {
+        "map_model": os.getenv('ROUTING_MAP_MODEL', 'gpt-4o-mini'),
+        "map_max_tokens": int(os.getenv('ROUTING_MAP_MAX_TOKENS', '1024')),
+        "fast_map_model": os.getenv('ROUTING_FAST_MAP_MODEL', 'gpt-4o-mini'),
+        "fast_map_max_tokens": int(os.getenv('ROUTING_FAST_MAP_MAX_TOKENS', '600')),
+        "synthesis_model": os.getenv('ROUTING_SYNTHESIS_MODEL', 'gpt-4o-mini'),
+        "synthesis_max_tokens": int(os.getenv('ROUTING_SYNTHESIS_MAX_TOKENS', '2048')),
+        "long_video_chunks": int(os.getenv('ROUTING_LONG_VIDEO_CHUNKS', '12')),
+        "long_transcript_chars": int(os.getenv('ROUTING_LONG_TRANSCRIPT_CHARS', '150000')),
+        "tight_deadline_seconds": float(os.getenv('ROUTING_TIGHT_DEADLINE_SECONDS', '90')),
+    }
+
+
+def get_library_path():
+    """Get the summary library database path from environment."""
+    return os.getenv('LIBRARY_DB', str(PROJECT_ROOT / 'library.db'))
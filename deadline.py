@@ -0,0 +1,129 @@
+"""Per-request deadlines and hedged calls for tail latency."""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from tracing import current_span
+
+# Longest single LLM call allowed, even with plenty of budget left
+CALL_TIMEOUT_CAP = 60.0
+
+# Minimum samples before p95 is trusted for hedging
+MIN_HEDGE_SAMPLES = 20
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request's time budget runs out."""
+
+
+class Deadline:
+    """Absolute time budget for one request, shared by all its stages."""
+    __slots__ = ("expires",)
+
+    def __init__(self, seconds=None):
+        self.expires = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self):
+        """Seconds left, or None for an unbounded deadline."""
+        if self.expires is None:
+            return None
+        return max(self.expires - time.monotonic(), 0.0)
+
+    @property
+    def expired(self):
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def check(self, stage=""):
+        """Raise DeadlineExceeded if no budget is left."""
+        if self.expired:
+            raise DeadlineExceeded(f"Deadline exceeded{' during ' + stage if stage else ''}")
+
+    def timeout(self, cap=CALL_TIMEOUT_CAP):
+        """Timeout for the next call: the remaining budget, capped."""
+        self.check()
+        remaining = self.remaining()
+        return cap if remaining is None else min(remaining, cap)
+
+
+class LatencyTracker:
+    """Rolling per-stage latency samples for percentile estimates."""
+
+    def __init__(self, window=200):
+        self._samples = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._samples.setdefault(stage, deque(maxlen=self._window)).append(seconds)
+
+    def percentile(self, stage, q):
+        """Return the q-th percentile (0-100) for stage, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples.get(stage, ()))
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return None
+        return samples[min(int(len(samples) * q / 100), len(samples) - 1)]
+
+
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+
+def hedged_call(call, client, hedge_after, client_factory):
+    """
+    Run call(client) and issue a duplicate if it has not finished after hedge_after seconds.
+
+    Without a hedge threshold the call simply runs in the caller's thread.
+    Otherwise both attempts run on the hedge pool, each with its own client
+    from client_factory, so the caller can wait with a timeout. The hedge
+    timer starts when the original attempt starts running, not when it is
+    queued, so a busy pool does not trigger extra hedges. The first
+    successful response wins; both clients are closed afterwards, which
+    abandons the losing attempt's request.
+
+    Args:
+        call: Callable taking an API client and returning the response
+        client: API client for an unhedged call
+        hedge_after: Seconds before the duplicate is sent (None disables hedging)
+        client_factory: Callable returning a new API client for each hedged attempt
+
+    Returns:
+        The winning attempt's return value
+    """
+    if hedge_after is None:
+        return call(client)
+
+    started = threading.Event()
+
+    def original(api_client):
+        started.set()
+        return call(api_client)
+
+    clients = [client_factory()]
+    futures = [_hedge_pool.submit(contextvars.copy_context().run, original, clients[0])]
+    try:
+        started.wait()
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done:
+            current_span().set_attribute("hedged", True)
+            clients.append(client_factory())
+            futures.append(_hedge_pool.submit(contextvars.copy_context().run, call, clients[1]))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        for future in futures:
+            future.cancel()
+        for api_client in clients:
+            try:
+                api_client.close()
+            except Exception:
+                pass
@@ -0,0 +1,85 @@
+"""Record and replay HTTP traffic so transcript fetching can run offline."""
+import json
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Default per-request timeout in seconds; YouTube calls otherwise never time out
+REQUEST_TIMEOUT = 15.0
+
+
+class PooledSession(requests.Session):
+    """requests.Session with a sized connection pool and a default timeout."""
+
+    def __init__(self, pool_size=4, timeout=REQUEST_TIMEOUT):
+        super().__init__()
+        self.timeout = timeout
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def _request_key(prepared):
+    """Identify a request by method, URL and body (the innertube POST differs only by body)."""
+    body = prepared.body or ""
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", "replace")
+    return f"{prepared.method} {prepared.url}\n{body}"
+
+
+class RecordingSession(PooledSession):
+    """PooledSession that appends every exchange to a JSON-lines cassette file."""
+
+    _lock = threading.Lock()
+
+    def __init__(self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        record = {
+            "key": _request_key(request),
+            "status": response.status_code,
+            "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+            "body": response.text,
+        }
+        with self._lock, open(self.path, "a", encoding="utf-8") as cassette:
+            cassette.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return response
+
+
+class ReplaySession(requests.Session):
+    """
+    Offline stand-in for requests.Session serving responses from a cassette file.
+
+    Requests missing from the cassette raise requests.ConnectionError, so
+    they exercise the same transient-error path as a network failure.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.responses = {}
+        with open(path, encoding="utf-8") as cassette:
+            for line in cassette:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses[record["key"]] = record
+
+    def send(self, request, **kwargs):
+        record = self.responses.get(_request_key(request))
+        if record is None:
+            raise requests.ConnectionError(f"No recorded response for {request.method} {request.url}")
+        response = requests.Response()
+        response.status_code = record["status"]
+        response.headers = CaseInsensitiveDict(record.get("headers", {}))
+        response._content = record["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
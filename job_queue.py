@@ -0,0 +1,231 @@
+"""Pluggable job queue with leases, heartbeats and visibility timeouts."""
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+
+class Lease:
+    """A task handed to one worker until its visibility timeout expires."""
+    __slots__ = ("task_id", "job_id", "stage", "payload", "attempts", "token")
+
+    def __init__(self, task_id, job_id, stage, payload, attempts, token):
+        self.task_id = task_id
+        self.job_id = job_id
+        self.stage = stage
+        self.payload = payload
+        self.attempts = attempts
+        self.token = token
+
+
+class JobQueue(ABC):
+    """
+    Interface for queue backends used by worker.py.
+
+    Tasks belong to a job and a stage. A leased task is invisible to other
+    workers until its lease expires; the owner extends it with heartbeat()
+    and removes it with ack(). Expired leases are re-delivered until the task
+    has been attempted max_attempts times, then it is buried. Backends also
+    keep small per-job results (prepared transcript, chunk summaries, final
+    result) so any worker can pick up the next stage.
+    """
+
+    @abstractmethod
+    def put(self, job_id, stage, payload, key=""):
+        """Enqueue a task; a repeated (job_id, stage, key) is ignored."""
+
+    @abstractmethod
+    def lease(self, stages, worker_id, visibility_timeout):
+        """Take the next ready or expired task from any of stages, or None."""
+
+    @abstractmethod
+    def heartbeat(self, lease, visibility_timeout):
+        """Extend a lease; returns False if it was lost to another worker."""
+
+    @abstractmethod
+    def ack(self, lease):
+        """Mark a leased task done; returns False if the lease was lost."""
+
+    @abstractmethod
+    def nack(self, lease, error, retry_delay=5.0):
+        """Release a failed task for retry, or bury it after max attempts."""
+
+    @abstractmethod
+    def set_result(self, job_id, key, value):
+        """Store a JSON-serializable per-job value."""
+
+    @abstractmethod
+    def get_result(self, job_id, key):
+        """Return a stored per-job value or None."""
+
+    @abstractmethod
+    def get_results(self, job_id, prefix):
+        """Return {key: value} for all per-job values whose key starts with prefix."""
+
+    @abstractmethod
+    def count_results(self, job_id, prefix):
+        """Return the number of per-job values whose key starts with prefix."""
+
+    @abstractmethod
+    def get_failure(self, job_id):
+        """Return the last error of a buried task of the job, or None."""
+
+
+class SQLiteJobQueue(JobQueue):
+    """Single-file SQLite backend; safe for many worker processes on one host."""
+
+    def __init__(self, path, max_attempts=3):
+        self.path = str(path)
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        self._connect().conn.executescript("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                task_key TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'ready',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_token TEXT,
+                lease_expires REAL,
+                available_at REAL NOT NULL,
+                last_error TEXT,
+                UNIQUE (job_id, stage, task_key)
+            );
+            CREATE INDEX IF NOT EXISTS tasks_ready ON tasks (stage, state, available_at);
+            CREATE TABLE IF NOT EXISTS results (
+                job_id TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                PRIMARY KEY (job_id, key)
+            );
+        """)
+
+    def _connect(self):
+        """Per-thread connection in WAL mode."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return _Transaction(conn)
+
+    def put(self, job_id, stage, payload, key=""):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO tasks (job_id, stage, task_key, payload, available_at) VALUES (?, ?, ?, ?, ?)",
+                (job_id, stage, key, json.dumps(payload), time.time()))
+
+    def lease(self, stages, worker_id, visibility_timeout):
+        now = time.time()
+        placeholders = ",".join("?" * len(stages))
+        with self._connect() as conn:
+            while True:
+                row = conn.execute(
+                    f"""SELECT id, job_id, stage, payload, attempts, state FROM tasks
+                        WHERE stage IN ({placeholders})
+                          AND ((state = 'ready' AND available_at <= ?) OR (state = 'leased' AND lease_expires < ?))
+                        ORDER BY available_at, id LIMIT 1""",
+                    (*stages, now, now)).fetchone()
+                if row is None:
+                    return None
+                task_id, job_id, stage, payload, attempts, state = row
+                if state == "ready" or attempts < self.max_attempts:
+                    break
+                # The last allowed attempt crashed or hung without a nack: bury it
+                conn.execute("UPDATE tasks SET state = 'dead', lease_token = NULL, last_error = ? WHERE id = ?",
+                             (f"Lease expired after {attempts} attempts", task_id))
+            token = uuid.uuid4().hex
+            conn.execute(
+                """UPDATE tasks SET state = 'leased', attempts = attempts + 1, lease_owner = ?,
+                   lease_token = ?, lease_expires = ? WHERE id = ?""",
+                (worker_id, token, now + visibility_timeout, task_id))
+        return Lease(task_id, job_id, stage, json.loads(payload), attempts + 1, token)
+
+    def heartbeat(self, lease, visibility_timeout):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE id = ? AND state = 'leased' AND lease_token = ?",
+                (time.time() + visibility_timeout, lease.task_id, lease.token))
+            return cursor.rowcount == 1
+
+    def ack(self, lease):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET state = 'done', lease_token = NULL WHERE id = ? AND state = 'leased' AND lease_token = ?",
+                (lease.task_id, lease.token))
+            return cursor.rowcount == 1
+
+    def nack(self, lease, error, retry_delay=5.0):
+        state = "dead" if lease.attempts >= self.max_attempts else "ready"
+        with self._connect() as conn:
+            conn.execute(
+                """UPDATE tasks SET state = ?, available_at = ?, last_error = ?, lease_token = NULL
+                   WHERE id = ? AND lease_token = ?""",
+                (state, time.time() + retry_delay * lease.attempts, str(error), lease.task_id, lease.token))
+        return state == "ready"
+
+    def set_result(self, job_id, key, value):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO results (job_id, key, value) VALUES (?, ?, ?)",
+                         (job_id, key, json.dumps(value)))
+
+    def get_result(self, job_id, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM results WHERE job_id = ? AND key = ?", (job_id, key)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_results(self, job_id, prefix):
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, value FROM results WHERE job_id = ? AND key >= ? AND key < ?",
+                                (job_id, prefix, prefix + "\uffff")).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def count_results(self, job_id, prefix):
+        with self._connect() as conn:
+            row = conn.execute("SELECT COUNT(*) FROM results WHERE job_id = ? AND key >= ? AND key < ?",
+                               (job_id, prefix, prefix + "\uffff")).fetchone()
+        return row[0]
+
+    def get_failure(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT last_error FROM tasks WHERE job_id = ? AND state = 'dead' ORDER BY id LIMIT 1",
+                               (job_id,)).fetchone()
+        return row[0] if row else None
+
+
+class _Transaction:
+    """Context manager running a block in one IMMEDIATE transaction."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+def open_queue(url):
+    """
+    Open a queue backend from a URL.
+
+    Args:
+        url: "sqlite:///path/to/jobs.db" or a plain file path
+
+    Returns:
+        JobQueue instance
+    """
+    if url.startswith("sqlite:///"):
+        return SQLiteJobQueue(url[len("sqlite:///"):])
+    if "://" in url:
+        raise ValueError(f"Unsupported queue backend: {url}")
+    return SQLiteJobQueue(url)
@@ -0,0 +1,164 @@
+"""Persistent summary library with a full-text inverted index."""
+import re
+import sqlite3
+import threading
+import time
+from results import SearchHit, SearchResults, dumps
+
+# Approximate size of indexed transcript segments
+SEGMENT_CHARS = 600
+
+TIMESTAMP_PATTERN = re.compile(r'\[(\d{1,2}:\d{2})\]')
+
+
+class Library:
+    """
+    SQLite store of transcripts, chunk summaries and final syntheses.
+
+    An FTS5 index (an inverted index with BM25 ranking) covers final
+    takeaways, chunk key points, claims, quotes and timestamped transcript
+    segments. Each pipeline run is indexed incrementally as it completes.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._conn().executescript("""
+            CREATE TABLE IF NOT EXISTS videos (
+                video_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                title TEXT NOT NULL,
+                transcript_text TEXT NOT NULL,
+                result_json TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunk_summaries (
+                video_id TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                summary_json TEXT NOT NULL,
+                PRIMARY KEY (video_id, chunk_index)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS entries USING fts5(
+                text, video_id UNINDEXED, kind UNINDEXED, time UNINDEXED,
+                tokenize = 'porter unicode61'
+            );
+        """)
+
+    def _conn(self):
+        """Per-thread connection in WAL mode."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def add_run(self, prepared, chunk_summaries, result):
+        """
+        Store and index one completed pipeline run, replacing any earlier run of the video.
+
+        Args:
+            prepared: PreparedTranscript
+            chunk_summaries: List of ChunkSummary objects
+            result: SummaryResult
+        """
+        video_id = prepared.video_id
+        rows = [(result.final_short_summary, "summary", "")]
+        rows += [(takeaway, "takeaway", "") for takeaway in result.final_key_takeaways]
+        rows += [(claim, "claim", "") for claim in result.top_claims_numbers]
+        rows += [(h.quote, "quote", h.time) for h in result.highlights]
+
+        for chunk, summary in zip(prepared.chunks, chunk_summaries):
+            # Chunk-level entries are located at the chunk's first timestamp
+            match = TIMESTAMP_PATTERN.search(chunk["text"])
+            chunk_time = match.group(1) if match else ""
+            rows += [(point, "key_point", chunk_time) for point in summary.key_points]
+            rows += [(claim, "claim", chunk_time) for claim in summary.claims_numbers]
+            rows += [(q.quote, "quote", q.time or chunk_time) for q in summary.notable_quotes]
+
+        rows += [(text, "transcript", segment_time) for segment_time, text in segment_transcript(prepared.transcript_text)]
+
+        conn = self._conn()
+        with self._write_lock, conn:
+            conn.execute("DELETE FROM entries WHERE video_id = ?", (video_id,))
+            conn.execute("DELETE FROM chunk_summaries WHERE video_id = ?", (video_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO videos (video_id, url, title, transcript_text, result_json, indexed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (video_id, prepared.url, result.title, prepared.transcript_text, result.to_json(), time.time()))
+            conn.executemany(
+                "INSERT INTO chunk_summaries (video_id, chunk_index, summary_json) VALUES (?, ?, ?)",
+                [(video_id, s.chunk_index, dumps(s.to_dict())) for s in chunk_summaries])
+            conn.executemany(
+                "INSERT INTO entries (text, video_id, kind, time) VALUES (?, ?, ?, ?)",
+                [(text, video_id, kind, entry_time) for text, kind, entry_time in rows if text])
+
+    def search(self, query, limit=20):
+        """
+        Search the index, best matches first.
+
+        Args:
+            query: Free-text query; all words must match (prefix match on the last word)
+            limit: Maximum hits
+
+        Returns:
+            SearchResults
+        """
+        started = time.perf_counter()
+        words = re.findall(r'\w+', query.lower())
+        hits = []
+        if words:
+            # Quote each word so user input never hits FTS5 query syntax
+            match = " ".join(f'"{word}"' for word in words[:-1]) + f' "{words[-1]}"*'
+            rows = self._conn().execute(
+                """SELECT e.video_id, v.url, v.title, e.kind, e.time,
+                          snippet(entries, 0, '[', ']', '…', 16), bm25(entries)
+                   FROM entries e JOIN videos v ON v.video_id = e.video_id
+                   WHERE entries MATCH ? ORDER BY bm25(entries) LIMIT ?""",
+                (match.strip(), limit)).fetchall()
+            hits = [SearchHit(video_id, url, title, kind, hit_time, snippet, round(-score, 3))
+                    for video_id, url, title, kind, hit_time, snippet, score in rows]
+        took_ms = round((time.perf_counter() - started) * 1000, 2)
+        return SearchResults(query, hits, took_ms)
+
+
+def segment_transcript(transcript_text):
+    """
+    Split a cleaned transcript into ~SEGMENT_CHARS pieces at timestamp markers.
+
+    Returns:
+        List of (mm:ss, text) tuples
+    """
+    segments = []
+    current_time, current = "", []
+    size = 0
+    parts = TIMESTAMP_PATTERN.split(transcript_text)
+    # split() yields [before, time1, text1, time2, text2, ...]
+    for position in range(1, len(parts) - 1, 2):
+        stamp, text = parts[position], parts[position + 1].strip()
+        if not current:
+            current_time = stamp
+        current.append(text)
+        size += len(text)
+        if size >= SEGMENT_CHARS:
+            segments.append((current_time, " ".join(current)))
+            current, size = [], 0
+    if current:
+        segments.append((current_time, " ".join(current)))
+    if not segments and transcript_text.strip():
+        segments.append(("", transcript_text.strip()))
+    return segments
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def get_library():
+    """Return the process-wide Library at LIBRARY_DB."""
+    global _library
+    from config import get_library_path
+    with _library_lock:
+        if _library is None:
+            _library = Library(get_library_path())
+        return _library
@@ -1,9 +1,22 @@
 """Main pipeline for YouTube URL → transcript → chunk → summarize → final JSON."""
-import json
-import sys
-from transcript_extractor import validate_youtube_url, extract_video_id, fetch_transcript, clean_transcript
+from transcript_extractor import (
+    validate_youtube_url, extract_video_id, fetch_transcript, prefetch_transcripts, clean_transcript,
+    TranscriptFetchError,
+)
 from chunker import chunk_transcript
-from summarizer import summarize_chunk, synthesize_chunks
+from summarizer import summarize_chunk, synthesize_chunks, PROMPT_VERSIONS
+from results import PipelineError, PreparedTranscript
+from deadline import Deadline, DeadlineExceeded
+from openai import RateLimitError
+from config import get_request_deadline
+from tracing import start_trace, span, traced, current_span
+from library import get_library
+from routing import get_policy
+
+
+def deadline_error(stage):
+    """Error returned when the request deadline runs out in a stage."""
+    return PipelineError("deadline_exceeded", f"Request deadline exceeded during {stage}.")
 
 
 def get_video_title(video_id):
@@ -13,134 +26,210 @@ def get_video_title(video_id):
     return ""
 
 
-def process_youtube_url(user_input):
+@traced("prepare_transcript")
+def prepare_transcript(user_input, deadline=None):
     """
-    Process YouTube URL through the complete pipeline.
+    Run the pre-LLM stages: validate, fetch, clean and chunk.
     
     Returns:
-        JSON string with final result or error
+        PreparedTranscript on success or PipelineError on failure
     """
     # Step 1: Validate input
     if not validate_youtube_url(user_input):
-        return json.dumps({
-            "status": "error",
-            "error_code": "invalid_url",
-            "message": "Input is not a valid YouTube URL."
-        }, indent=2)
+        return PipelineError("invalid_url", "Input is not a valid YouTube URL.")
     
     # Step 2: Extract video ID
     video_id = extract_video_id(user_input)
+    current_span().set_attribute("video_id", video_id)
     
     # Step 3: Fetch transcript
     try:
-        transcript_data = fetch_transcript(video_id)
+        with span("fetch_transcript", video_id=video_id):
+            transcript_data = fetch_transcript(video_id, deadline)
         if transcript_data is None:
-            return json.dumps({
-                "status": "error",
-                "error_code": "no_transcript",
-                "message": "No transcript or captions found for this video."
-            }, indent=2)
+            return PipelineError("no_transcript", "No transcript or captions found for this video.")
+    except DeadlineExceeded:
+        return deadline_error("fetch")
+    except TranscriptFetchError as e:
+        return PipelineError("transcript_fetch_failed", f"YouTube is not responding, try again later: {str(e)}")
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "error_code": "unknown_error",
-            "message": f"Error fetching transcript: {str(e)}"
-        }, indent=2)
+        return PipelineError("unknown_error", f"Error fetching transcript: {str(e)}")
+    
+    if deadline is not None and deadline.expired:
+        return deadline_error("fetch")
     
     # Step 4: Clean & normalize
     try:
-        transcript_text = clean_transcript(transcript_data)
+        with span("clean_transcript", snippets=len(transcript_data)) as active:
+            transcript_text = clean_transcript(transcript_data)
+            active.set_attribute("transcript_chars", len(transcript_text))
         
         if len(transcript_text) < 50:
-            return json.dumps({
-                "status": "error",
-                "error_code": "transcript_too_short",
-                "message": "Transcript appears too short."
-            }, indent=2)
+            return PipelineError("transcript_too_short", "Transcript appears too short.")
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "error_code": "unknown_error",
-            "message": f"Error cleaning transcript: {str(e)}"
-        }, indent=2)
+        return PipelineError("unknown_error", f"Error cleaning transcript: {str(e)}")
     
     # Step 5: Chunk the transcript
     try:
-        chunks = chunk_transcript(transcript_text)
+        with span("chunk_transcript") as active:
+            chunks = chunk_transcript(transcript_text)
+            active.set_attribute("chunks", len(chunks))
     except Exception as e:
-        return json.dumps({
-            "status": "error",
-            "error_code": "unknown_error",
-            "message": f"Error chunking transcript: {str(e)}"
-        }, indent=2)
+        return PipelineError("unknown_error", f"Error chunking transcript: {str(e)}")
     
-    # Step 6: Summarize each chunk
-    chunk_summaries = []
-    for chunk in chunks:
-        try:
-            summary = summarize_chunk(chunk, retry_count=1)
-            if summary is None:
-                return json.dumps({
-                    "status": "error",
-                    "error_code": "chunk_summarization_failed",
-                    "failed_chunk": chunk["index"],
-                    "message": "Chunk summarization returned invalid output."
-                }, indent=2)
-            chunk_summaries.append(summary)
-        except Exception as e:
-            # Check for rate limit
-            error_str = str(e).lower()
-            if "rate limit" in error_str or "429" in error_str:
-                return json.dumps({
-                    "status": "error",
-                    "error_code": "api_rate_limit",
-                    "message": "Upstream API rate limit or network error."
-                }, indent=2)
-            return json.dumps({
-                "status": "error",
-                "error_code": "chunk_summarization_failed",
-                "failed_chunk": chunk["index"],
-                "message": f"Chunk summarization failed: {str(e)}"
-            }, indent=2)
+    # Step 6: Route the LLM stages by video size and remaining budget
+    routes = get_policy().plan(len(chunks), len(transcript_text), deadline)
+    current_span().set_attribute("map_model", routes["map"].model)
     
-    # Step 7: Synthesize chunks
+    return PreparedTranscript(video_id, user_input, transcript_text, chunks, routes)
+
+
+@traced("summarize_chunk")
+def run_chunk(chunk, deadline=None, route=None):
+    """
+    Summarize one chunk (map stage) with the routed model and budget.
+    
+    Returns:
+        ChunkSummary on success or PipelineError on failure
+    """
+    current_span().set_attribute("chunk_index", chunk["index"])
+    current_span().set_attribute("chunk_chars", len(chunk["text"]))
     try:
-        title = get_video_title(video_id)
-        final_result = synthesize_chunks(chunk_summaries, video_id, user_input, title, retry_count=1)
+        summary = summarize_chunk(chunk, retry_count=1, deadline=deadline, route=route)
+        if summary is None:
+            return PipelineError("chunk_summarization_failed", "Chunk summarization returned invalid output.", failed_chunk=chunk["index"])
+        return summary
+    except DeadlineExceeded:
+        return deadline_error(f"chunk {chunk['index']}")
+    except RateLimitError:
+        return PipelineError("api_rate_limit", "Upstream API rate limit or network error.")
+    except Exception as e:
+        # Check for rate limit
+        error_str = str(e).lower()
+        if "rate limit" in error_str or "429" in error_str:
+            return PipelineError("api_rate_limit", "Upstream API rate limit or network error.")
+        return PipelineError("chunk_summarization_failed", f"Chunk summarization failed: {str(e)}", failed_chunk=chunk["index"])
+
+
+@traced("synthesize")
+def run_synthesis(prepared, chunk_summaries, deadline=None):
+    """
+    Synthesize chunk summaries into the final result (reduce stage).
+    
+    The routing choices and prompt template versions of both stages are
+    recorded in the result metadata.
+    
+    Returns:
+        SummaryResult on success or PipelineError on failure
+    """
+    try:
+        title = get_video_title(prepared.video_id)
+        final_result = synthesize_chunks(chunk_summaries, prepared.video_id, prepared.url, title, retry_count=1,
+                                         deadline=deadline, route=prepared.routes.get("synthesis"))
         
         if final_result is None:
-            return json.dumps({
-                "status": "error",
-                "error_code": "synthesis_failed",
-                "message": "Synthesis step failed to produce valid JSON."
-            }, indent=2)
+            return PipelineError("synthesis_failed", "Synthesis step failed to produce valid JSON.")
+        
+        final_result.metadata["routing"] = {stage: route.to_dict() for stage, route in prepared.routes.items()}
+        final_result.metadata["prompt_versions"] = dict(PROMPT_VERSIONS)
         
-        # Step 8: Return final JSON
-        return json.dumps(final_result, indent=2)
+        index_run(prepared, chunk_summaries, final_result)
+        return final_result
         
+    except DeadlineExceeded:
+        return deadline_error("synthesis")
+    except RateLimitError:
+        return PipelineError("api_rate_limit", "Upstream API rate limit or network error.")
     except Exception as e:
         error_str = str(e).lower()
         if "rate limit" in error_str or "429" in error_str:
-            return json.dumps({
-                "status": "error",
-                "error_code": "api_rate_limit",
-                "message": "Upstream API rate limit or network error."
-            }, indent=2)
-        return json.dumps({
-            "status": "error",
-            "error_code": "synthesis_failed",
-            "message": f"Synthesis failed: {str(e)}"
-        }, indent=2)
+            return PipelineError("api_rate_limit", "Upstream API rate limit or network error.")
+        return PipelineError("synthesis_failed", f"Synthesis failed: {str(e)}")
+
+
+def index_run(prepared, chunk_summaries, result):
+    """Add a finished run to the searchable library; indexing failures never fail the run."""
+    try:
+        with span("index_library", video_id=prepared.video_id):
+            get_library().add_run(prepared, chunk_summaries, result)
+    except Exception:
+        pass
+
+
+def process_youtube_url(user_input, deadline=None):
+    """
+    Process YouTube URL through the complete pipeline.
+    
+    Each invocation is recorded as one trace (exported when TRACE_FILE is set).
+    
+    Args:
+        user_input: YouTube URL
+        deadline: Deadline shared by every stage (default REQUEST_DEADLINE_SECONDS)
+    
+    Returns:
+        SummaryResult on success or PipelineError on failure
+    """
+    with start_trace("process_youtube_url", url=user_input) as root:
+        result = _process(user_input, deadline)
+        root.set_attribute("status", result.status)
+        return result
+
+
+def _process(user_input, deadline=None):
+    """Run all stages of the pipeline inside the current trace."""
+    deadline = deadline or Deadline(get_request_deadline())
+    
+    # Steps 1-5: Validate, fetch, clean and chunk
+    prepared = prepare_transcript(user_input, deadline)
+    if isinstance(prepared, PipelineError):
+        return prepared
+    
+    # Step 6: Summarize each chunk
+    chunk_summaries = []
+    for chunk in prepared.chunks:
+        summary = run_chunk(chunk, deadline, prepared.routes.get("map"))
+        if isinstance(summary, PipelineError):
+            return summary
+        chunk_summaries.append(summary)
+    
+    # Step 7: Synthesize chunks
+    # Step 8: Return final result
+    return run_synthesis(prepared, chunk_summaries, deadline)
 
 
 if __name__ == "__main__":
+    import argparse
+    import os
+    import sys
+    from tracing import profile
+    
+    if sys.argv[1:2] == ["search"]:
+        # python main.py search QUERY [--limit N]
+        parser = argparse.ArgumentParser(prog="main.py search", description="Search summarized videos.")
+        parser.add_argument("query", nargs="+")
+        parser.add_argument("--limit", type=int, default=20, help="Maximum hits")
+        args = parser.parse_args(sys.argv[2:])
+        print(get_library().search(" ".join(args.query), args.limit).to_json(indent=True))
+        sys.exit(0)
+    
+    parser = argparse.ArgumentParser(description="Summarize a YouTube video.")
+    parser.add_argument("urls", nargs="*", metavar="url", help="YouTube URLs (prompted if omitted)")
+    parser.add_argument("--profile", action="store_true", help="Write a cProfile dump to PROFILE_DIR")
+    parser.add_argument("--trace-file", help="Append the run's trace (OTLP JSON lines) to this file")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="Time budget per video (default: none; the map stage runs serially here)")
+    args = parser.parse_args()
+    
     # Get user input
-    if len(sys.argv) > 1:
-        user_input = sys.argv[1]
-    else:
-        user_input = input("Enter YouTube URL: ").strip()
+    urls = args.urls or [input("Enter YouTube URL: ").strip()]
+    if args.trace_file:
+        os.environ['TRACE_FILE'] = args.trace_file
+    
+    # Later videos' transcripts are fetched while earlier ones are summarized
+    prefetch_transcripts([url for url in urls[1:] if validate_youtube_url(url)])
     
     # Process and output JSON
-    result = process_youtube_url(user_input)
-    print(result)
-
+    for position, user_input in enumerate(urls):
+        with profile(args.profile, f"cli-{os.getpid()}-{position}"):
+            result = process_youtube_url(user_input, Deadline(args.deadline))
+        print(result.to_json(indent=True))
@@ -0,0 +1,198 @@
+"""Deterministic local merge and fuzzy deduplication of chunk summaries before synthesis."""
+import re
+import zlib
+import numpy as np
+from results import MergedSummaries
+
+# Cosine similarity of character trigram profiles above which two entries are duplicates
+SIMILARITY_THRESHOLD = 0.8
+
+# Hashed feature space for trigram profiles
+FEATURE_DIM = 2048
+NGRAM = 3
+
+# Rows compared per matrix product, bounding memory for very long videos
+BLOCK_SIZE = 512
+
+# Words that flip a statement's meaning; near duplicates must agree on them
+NEGATIONS = frozenset((
+    "not", "no", "never", "none", "nor", "neither", "nothing", "nobody", "nowhere", "without", "cannot",
+    "t",  # "don't", "isn't" etc. normalize to "don t", "isn t"
+    "dont", "doesnt", "didnt", "isnt", "arent", "wasnt", "werent", "cant", "wont", "shouldnt", "wouldnt",
+))
+
+# Most entries per field sent to synthesis, after ranking
+MAX_ITEMS = {"key_points": 60, "notable_quotes": 30, "claims_numbers": 40, "verify_flags": 30}
+
+
+def normalize(text):
+    """Lowercase, drop [mm:ss] timestamps and punctuation, collapse whitespace."""
+    text = re.sub(r'\[\d{1,2}:\d{2}\]', ' ', text.lower())
+    text = re.sub(r'[^\w\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def _vectorize(texts):
+    """Build L2-normalized hashed trigram count vectors, one row per text."""
+    matrix = np.zeros((len(texts), FEATURE_DIM), dtype=np.float32)
+    for row, text in enumerate(texts):
+        padded = f" {text} "
+        if len(padded) < NGRAM:
+            continue
+        grams = [zlib.crc32(padded[i:i + NGRAM].encode('utf-8')) % FEATURE_DIM
+                 for i in range(len(padded) - NGRAM + 1)]
+        matrix[row] = np.bincount(grams, minlength=FEATURE_DIM)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def signature(text):
+    """
+    Numbers and negation words of a normalized text.
+
+    Near-duplicates are only merged when these match exactly, since claims
+    differing in a figure or a "not" say different things.
+    """
+    words = text.split()
+    numbers = tuple(word for word in words if word.isdigit())
+    negations = tuple(sorted(word for word in words if word in NEGATIONS))
+    return numbers, negations
+
+
+def _cluster(texts, threshold=SIMILARITY_THRESHOLD):
+    """
+    Assign each text to the earliest similar representative with the same signature.
+
+    Returns:
+        List of representative indices, one per input text
+    """
+    count = len(texts)
+    vectors = _vectorize(texts)
+    signatures = [signature(text) for text in texts]
+    is_rep = np.zeros(count, dtype=bool)
+    assigned = np.arange(count)
+
+    for start in range(0, count, BLOCK_SIZE):
+        end = min(start + BLOCK_SIZE, count)
+        # Similarity of this block against every earlier-or-same row, in one product
+        sims = vectors[start:end] @ vectors[:end].T
+        for i in range(start, end):
+            earlier = np.flatnonzero((sims[i - start, :i] >= threshold) & is_rep[:i])
+            match = next((int(j) for j in earlier if signatures[j] == signatures[i]), None)
+            if match is not None:
+                assigned[i] = match
+            else:
+                is_rep[i] = True
+    return assigned.tolist()
+
+
+def _spread(chunks):
+    """
+    Number of distinct, mutually non-adjacent chunks in a set of chunk indices.
+
+    An entry repeated only in neighbouring chunks usually comes from their
+    shared overlap, so it counts once.
+    """
+    spread, last = 0, None
+    for index in sorted(chunks):
+        if last is None or index > last + 1:
+            spread += 1
+            last = index
+    return spread
+
+
+def dedupe(entries, text_of=lambda entry: entry, limit=None, chunks=None, fuzzy=True):
+    """
+    Deduplicate entries and rank them by how many separate chunks repeat them.
+
+    Entries equal after normalization are always merged. With fuzzy, near
+    duplicates (similar trigram profiles, identical numbers and negations)
+    are merged too. Within a cluster the longest entry is kept. Clusters
+    are ranked by the number of non-adjacent chunks they appear in (ties by
+    first appearance); the kept entries are returned in order of first
+    appearance so the transcript order survives.
+
+    Args:
+        entries: Entries in transcript order
+        text_of: Function returning the text to compare for an entry
+        limit: Maximum number of entries to return
+        chunks: Chunk index of each entry (default: every entry its own chunk)
+        fuzzy: Merge near duplicates, not just exact ones
+
+    Returns:
+        Deduplicated list of entries
+    """
+    if chunks is None:
+        chunks = range(0, 2 * len(entries), 2)
+
+    # Exact duplicates after normalization are merged before the vector pass
+    first_seen = {}
+    unique, sources = [], []
+    for entry, chunk in zip(entries, chunks):
+        key = normalize(text_of(entry))
+        if not key:
+            continue
+        if key in first_seen:
+            sources[first_seen[key]].add(chunk)
+            if len(text_of(entry)) > len(text_of(unique[first_seen[key]])):
+                unique[first_seen[key]] = entry
+            continue
+        first_seen[key] = len(unique)
+        unique.append(entry)
+        sources.append({chunk})
+
+    if not unique:
+        return []
+
+    assigned = _cluster(list(first_seen)) if fuzzy else range(len(unique))
+    clusters = {}
+    for index, rep in enumerate(assigned):
+        members = clusters.setdefault(rep, [])
+        members.append(index)
+
+    def weight(members):
+        return _spread(set().union(*(sources[i] for i in members)))
+
+    ranked = sorted(clusters.items(), key=lambda item: (-weight(item[1]), item[0]))
+    if limit is not None:
+        ranked = ranked[:limit]
+
+    kept = []
+    for rep, members in sorted(ranked, key=lambda item: item[0]):
+        best = max(members, key=lambda i: (len(text_of(unique[i])), -i))
+        kept.append(unique[best])
+    return kept
+
+
+def merge_chunk_summaries(chunk_summaries):
+    """
+    Condense chunk summaries into one deduplicated digest for synthesis.
+
+    Overlapping chunks repeat the same key points, quotes and claims; these
+    are merged locally so the synthesis prompt only carries each once.
+    Claims and verify flags keep their exact wording and figures, so only
+    exact duplicates of them are merged.
+
+    Args:
+        chunk_summaries: List of ChunkSummary objects in chunk order
+
+    Returns:
+        MergedSummaries
+    """
+    def collect(field, text_of=lambda entry: entry, fuzzy=True):
+        entries, chunks = [], []
+        for summary in chunk_summaries:
+            for item in getattr(summary, field):
+                entries.append(item)
+                chunks.append(summary.chunk_index)
+        return dedupe(entries, text_of=text_of, limit=MAX_ITEMS[field], chunks=chunks, fuzzy=fuzzy)
+
+    return MergedSummaries(
+        chunks_count=len(chunk_summaries),
+        chunk_summaries=[f"[{s.chunk_index}] {s.chunk_summary}" for s in chunk_summaries],
+        key_points=collect("key_points"),
+        notable_quotes=collect("notable_quotes", text_of=lambda quote: quote.quote),
+        claims_numbers=collect("claims_numbers", fuzzy=False),
+        verify_flags=collect("verify_flags", fuzzy=False),
+    )
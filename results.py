@@ -0,0 +1,238 @@
+"""Typed pipeline result objects and edge serialization."""
+import json
+from dataclasses import dataclass, field, asdict
+
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib encoder
+    orjson = None
+
+# Fixed prompt/schema overhead of one LLM call, expressed in transcript characters
+CALL_OVERHEAD_CHARS = 2000
+
+
+def dumps(obj, indent=False):
+    """
+    Serialize plain data to a JSON string.
+
+    Uses orjson when installed, otherwise the stdlib encoder with compact
+    separators. Output is compact unless indent is requested (CLI display).
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option).decode('utf-8')
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False)
+
+
+@dataclass(slots=True)
+class Quote:
+    """Timestamped quote from the transcript."""
+    time: str
+    quote: str
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(time=data.get("time", ""), quote=data.get("quote", ""))
+
+
+@dataclass(slots=True)
+class Route:
+    """Model, output budget and verbosity chosen for one LLM stage."""
+    stage: str
+    model: str
+    max_tokens: int
+    verbosity: str = "standard"
+    reason: str = "default"
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class PreparedTranscript:
+    """Output of the fetch/clean/chunk stages, ready for the LLM stages."""
+    video_id: str
+    url: str
+    transcript_text: str
+    chunks: list
+    routes: dict = field(default_factory=dict)
+
+    @property
+    def size(self):
+        """Estimated job size in characters, including per-call overhead."""
+        return len(self.transcript_text) + CALL_OVERHEAD_CHARS * (len(self.chunks) + 1)
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        data["routes"] = {stage: Route.from_dict(route) for stage, route in data.get("routes", {}).items()}
+        return cls(**data)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class ChunkSummary:
+    """Map-phase output for a single transcript chunk."""
+    chunk_index: int
+    chunk_total: int
+    chunk_summary: str
+    key_points: list = field(default_factory=list)
+    notable_quotes: list = field(default_factory=list)
+    claims_numbers: list = field(default_factory=list)
+    verify_flags: list = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a schema-validated dict."""
+        data = dict(data)
+        data["notable_quotes"] = [Quote.from_dict(q) for q in data.get("notable_quotes", [])]
+        return cls(**data)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class MergedSummaries:
+    """Deduplicated digest of all chunk summaries, used as synthesis input."""
+    chunks_count: int
+    chunk_summaries: list = field(default_factory=list)
+    key_points: list = field(default_factory=list)
+    notable_quotes: list = field(default_factory=list)
+    claims_numbers: list = field(default_factory=list)
+    verify_flags: list = field(default_factory=list)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+@dataclass(slots=True)
+class SummaryResult:
+    """Final synthesized summary for a video."""
+    video_id: str
+    video_url: str
+    title: str
+    final_short_summary: str
+    final_key_takeaways: list = field(default_factory=list)
+    top_claims_numbers: list = field(default_factory=list)
+    highlights: list = field(default_factory=list)
+    next_steps: list = field(default_factory=list)
+    confidence: str = ""
+    chunks_count: int = 0
+    metadata: dict = field(default_factory=dict)
+
+    status = "ok"
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build from a schema-validated dict (the status field is implied)."""
+        data = {k: v for k, v in data.items() if k != "status"}
+        data["highlights"] = [Quote.from_dict(q) for q in data.get("highlights", [])]
+        return cls(**data)
+
+    def to_dict(self):
+        return {"status": self.status, **asdict(self)}
+
+    def to_json(self, indent=False):
+        return dumps(self.to_dict(), indent=indent)
+
+
+@dataclass(slots=True)
+class PipelineError:
+    """Pipeline failure with a stable error code."""
+    error_code: str
+    message: str
+    failed_chunk: int = None
+    retry_after: float = None
+
+    status = "error"
+
+    def to_dict(self):
+        data = {"status": self.status, "error_code": self.error_code}
+        if self.failed_chunk is not None:
+            data["failed_chunk"] = self.failed_chunk
+        data["message"] = self.message
+        if self.retry_after is not None:
+            data["retry_after_seconds"] = self.retry_after
+        return data
+
+    def to_json(self, indent=False):
+        return dumps(self.to_dict(), indent=indent)
+
+
+@dataclass(slots=True)
+class QueuedJob:
+    """Accepted job that will finish later; poll /api/jobs/<job_id>."""
+    job_id: str
+    eta_seconds: float
+
+    status = "queued"
+
+    def to_dict(self):
+        return {"status": self.status, **asdict(self)}
+
+    def to_json(self, indent=False):
+        return dumps(self.to_dict(), indent=indent)
+
+
+@dataclass(slots=True)
+class CostEstimate:
+    """Pre-flight estimate of a job's LLM cost and duration, with the admission decision."""
+    video_id: str
+    chunks_count: int
+    transcript_chars: int
+    llm_calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+    service_seconds: float
+    queue_wait_seconds: float
+    eta_seconds: float
+    quota_remaining_tokens: int
+    decision: str = "accept"
+    reason: str = None
+    retry_after_seconds: float = None
+
+    status = "estimate"
+
+    def to_dict(self):
+        return {"status": self.status, **asdict(self)}
+
+    def to_json(self, indent=False):
+        return dumps(self.to_dict(), indent=indent)
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """One ranked library match, located by video and timestamp."""
+    video_id: str
+    video_url: str
+    title: str
+    kind: str
+    time: str
+    snippet: str
+    score: float
+
+
+@dataclass(slots=True)
+class SearchResults:
+    """Ranked hits for a library search."""
+    query: str
+    hits: list = field(default_factory=list)
+    took_ms: float = 0.0
+
+    status = "ok"
+
+    def to_dict(self):
+        return {"status": self.status, **asdict(self)}
+
+    def to_json(self, indent=False):
+        return dumps(self.to_dict(), indent=indent)
@@ -0,0 +1,90 @@
+"""Per-stage model routing based on video size and latency budget."""
+import threading
+from results import Route
+
+# Extra system prompt instructions per stage and verbosity; "standard" leaves prompts unchanged
+VERBOSITY_INSTRUCTIONS = {
+    "map": {
+        "brief": "Be concise: at most 4 key points, 2 quotes, 4 claims and 3 verify flags; keep every string short.",
+    },
+    "synthesis": {
+        "brief": "Be concise: a 2 sentence summary, at most 4 takeaways, 3 highlights and 3 next steps.",
+    },
+}
+
+
+class RoutingPolicy:
+    """
+    Choose model, max_tokens and verbosity for the map and synthesis stages.
+
+    The map stage is high-volume extractive work, so long videos (by chunk
+    count or transcript length) and tight deadlines move it to the fast
+    tier: a cheaper model with a smaller, brief output. Synthesis is a
+    single call and keeps its model and budget; under a tight deadline it
+    is also asked for brief output.
+    """
+
+    def __init__(self, map_model="gpt-4o-mini", map_max_tokens=1024,
+                 fast_map_model="gpt-4o-mini", fast_map_max_tokens=600,
+                 synthesis_model="gpt-4o-mini", synthesis_max_tokens=2048,
+                 long_video_chunks=12, long_transcript_chars=150000, tight_deadline_seconds=90.0):
+        self.map_model = map_model
+        self.map_max_tokens = map_max_tokens
+        self.fast_map_model = fast_map_model
+        self.fast_map_max_tokens = fast_map_max_tokens
+        self.synthesis_model = synthesis_model
+        self.synthesis_max_tokens = synthesis_max_tokens
+        self.long_video_chunks = long_video_chunks
+        self.long_transcript_chars = long_transcript_chars
+        self.tight_deadline_seconds = tight_deadline_seconds
+
+    def default(self, stage):
+        """Route used when no plan was made (e.g. direct library calls)."""
+        if stage == "map":
+            return Route("map", self.map_model, self.map_max_tokens)
+        return Route("synthesis", self.synthesis_model, self.synthesis_max_tokens)
+
+    def plan(self, chunks_count, transcript_chars, deadline=None):
+        """
+        Route both LLM stages of one job.
+
+        Args:
+            chunks_count: Number of transcript chunks
+            transcript_chars: Length of the cleaned transcript
+            deadline: Deadline of the request, if any
+
+        Returns:
+            Dict mapping "map" and "synthesis" to Route objects
+        """
+        remaining = deadline.remaining() if deadline is not None else None
+        tight = remaining is not None and remaining < self.tight_deadline_seconds
+        long_video = chunks_count >= self.long_video_chunks or transcript_chars >= self.long_transcript_chars
+
+        routes = {"map": self.default("map"), "synthesis": self.default("synthesis")}
+        if tight or long_video:
+            reason = "tight_deadline" if tight else "long_video"
+            routes["map"] = Route("map", self.fast_map_model, self.fast_map_max_tokens, "brief", reason)
+        if tight:
+            routes["synthesis"].verbosity = "brief"
+            routes["synthesis"].reason = "tight_deadline"
+        return routes
+
+
+def verbosity_instruction(route):
+    """System prompt suffix for a route's verbosity (empty for standard output)."""
+    instruction = VERBOSITY_INSTRUCTIONS.get(route.stage, {}).get(route.verbosity, "")
+    return " " + instruction if instruction else ""
+
+
+_policy = None
+_policy_lock = threading.Lock()
+
+
+def get_policy():
+    """Return the process-wide RoutingPolicy configured from environment."""
+    global _policy
+    from config import get_routing_settings
+    with _policy_lock:
+        if _policy is None:
+            _policy = RoutingPolicy(**get_routing_settings())
+        return _policy
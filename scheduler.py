@@ -0,0 +1,233 @@
+"""Shortest-job-first, per-client fair scheduling of pipeline LLM work."""
+import heapq
+import itertools
+import threading
+import time
+import uuid
+from main import run_chunk, run_synthesis, deadline_error
+from deadline import Deadline
+from tracing import attach, open_span, close_span
+from results import PipelineError, CALL_OVERHEAD_CHARS
+
+# How long finished jobs stay queryable by ID
+JOB_RETENTION_SECONDS = 3600
+
+
+class Job:
+    """A prepared transcript moving through the map and reduce stages."""
+    __slots__ = ("job_id", "client_id", "prepared", "summaries", "next_chunk", "in_flight",
+                 "completed", "synthesis_started", "remaining", "result", "done", "created", "deadline", "span")
+
+    def __init__(self, client_id, prepared, deadline=None):
+        self.job_id = uuid.uuid4().hex
+        self.client_id = client_id
+        self.prepared = prepared
+        self.summaries = [None] * len(prepared.chunks)
+        self.next_chunk = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.synthesis_started = False
+        self.remaining = prepared.size
+        self.result = None
+        self.done = threading.Event()
+        self.created = time.time()
+        self.deadline = deadline or Deadline()
+        # Held open until the job finishes, so a request that stops waiting
+        # does not export its trace before the job's calls have run
+        self.span = open_span("job", chunks=len(prepared.chunks), client_id=client_id)
+
+    def pending_calls(self):
+        """LLM calls not yet finished for this job (queued or in flight)."""
+        if self.result is not None:
+            return 0
+        queued = len(self.prepared.chunks) - self.next_chunk + (0 if self.synthesis_started else 1)
+        return queued + self.in_flight
+
+    def next_task(self):
+        """Return the next dispatchable task as (kind, chunk position) or None."""
+        if self.result is not None:
+            return None
+        if self.next_chunk < len(self.prepared.chunks):
+            return ("chunk", self.next_chunk)
+        if self.completed == len(self.prepared.chunks) and not self.synthesis_started:
+            return ("synthesis", None)
+        return None
+
+
+class FairScheduler:
+    """
+    Dispatch chunk and synthesis calls from many jobs onto a shared worker pool.
+
+    Each client may have at most per_client_jobs jobs in the LLM stages; the
+    rest wait in a per-client queue ordered by estimated size (shortest job
+    first). Worker slots are shared between clients by weighted virtual time,
+    so chunk calls from different jobs are interleaved and a client submitting
+    long videos cannot starve clients submitting short ones.
+    """
+
+    def __init__(self, workers=4, per_client_jobs=2, weights=None, default_weight=1.0):
+        self.workers = workers
+        self.per_client_jobs = per_client_jobs
+        self.weights = weights or {}
+        self.default_weight = default_weight
+        self._cond = threading.Condition()
+        self._waiting = {}   # client_id -> heap of (size, seq, job)
+        self._active = {}    # client_id -> list of jobs in the LLM stages
+        self._vtime = {}     # client_id -> weighted virtual time
+        self._jobs = {}
+        self._seq = itertools.count()
+        self._threads = []
+        self._finish_listeners = []
+
+    def add_finish_listener(self, listener):
+        """Register a callable invoked with each Job once its result is set."""
+        self._finish_listeners.append(listener)
+
+    def _weight(self, client_id):
+        return self.weights.get(client_id, self.default_weight)
+
+    def _start(self):
+        """Start worker threads on first use."""
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"scheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, client_id, prepared, deadline=None):
+        """Queue a PreparedTranscript for the LLM stages and return its Job."""
+        job = Job(client_id, prepared, deadline)
+        with self._cond:
+            self._start()
+            self._prune()
+            self._jobs[job.job_id] = job
+            heapq.heappush(self._waiting.setdefault(client_id, []),
+                           (prepared.size, next(self._seq), job))
+            self._admit(client_id)
+            self._cond.notify_all()
+        return job
+
+    def run(self, client_id, prepared, deadline=None):
+        """Submit a job and block until its SummaryResult or PipelineError is ready."""
+        job = self.submit(client_id, prepared, deadline)
+        if not job.done.wait(job.deadline.remaining()):
+            # Give in-flight calls a moment to observe the same deadline
+            job.done.wait(1.0)
+        return job.result if job.done.is_set() else deadline_error("scheduling")
+
+    def get(self, job_id):
+        """Look up a submitted job by ID."""
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        """Snapshot of queue depth for monitoring and admission decisions."""
+        with self._cond:
+            waiting = sum(len(heap) for heap in self._waiting.values())
+            active = sum(len(jobs) for jobs in self._active.values())
+            pending_chars = sum(job.remaining for jobs in self._active.values() for job in jobs)
+            pending_chars += sum(entry[0] for heap in self._waiting.values() for entry in heap)
+            pending_calls = sum(job.pending_calls() for jobs in self._active.values() for job in jobs)
+            pending_calls += sum(entry[2].pending_calls() for heap in self._waiting.values() for entry in heap)
+            return {"workers": self.workers, "waiting_jobs": waiting, "active_jobs": active,
+                    "pending_chars": pending_chars, "pending_calls": pending_calls}
+
+    def _admit(self, client_id):
+        """Move the client's shortest waiting jobs into the LLM stages (lock held)."""
+        heap = self._waiting.get(client_id)
+        active = self._active.setdefault(client_id, [])
+        while heap and len(active) < self.per_client_jobs:
+            if not active:
+                # A client returning from idle starts at the current minimum virtual
+                # time so it cannot bank credit while it had nothing queued
+                busy = [self._vtime[c] for c, jobs in self._active.items() if jobs and c != client_id]
+                self._vtime[client_id] = max(self._vtime.get(client_id, 0.0), min(busy, default=0.0))
+            _, _, job = heapq.heappop(heap)
+            active.append(job)
+
+    def _pick(self):
+        """Choose the next (job, task) by client virtual time, then shortest remaining job (lock held)."""
+        best = None
+        for client_id, jobs in self._active.items():
+            for job in list(jobs):
+                if job.result is None and job.deadline.expired:
+                    # Drop remaining calls of a job that can no longer finish in time
+                    job.result = deadline_error("scheduling")
+                    if job.in_flight == 0:
+                        self._finish(job)
+                    continue
+                task = job.next_task()
+                if task is None:
+                    continue
+                key = (self._vtime.get(client_id, 0.0), job.remaining)
+                if best is None or key < best[0]:
+                    best = (key, job, task)
+        if best is None:
+            return None
+        _, job, task = best
+
+        kind, position = task
+        if kind == "chunk":
+            cost = len(job.prepared.chunks[position]["text"]) + CALL_OVERHEAD_CHARS
+            job.next_chunk += 1
+        else:
+            cost = CALL_OVERHEAD_CHARS
+            job.synthesis_started = True
+        job.in_flight += 1
+        job.remaining -= cost
+        self._vtime[job.client_id] = self._vtime.get(job.client_id, 0.0) + cost / self._weight(job.client_id)
+        return job, task
+
+    def _work(self):
+        """Worker loop: run one chunk or synthesis call at a time."""
+        while True:
+            with self._cond:
+                picked = self._pick()
+                while picked is None:
+                    self._cond.wait()
+                    picked = self._pick()
+            job, (kind, position) = picked
+
+            # Record this call's spans under the submitting request's trace
+            with attach(job.span):
+                if kind == "chunk":
+                    outcome = run_chunk(job.prepared.chunks[position], job.deadline,
+                                        job.prepared.routes.get("map"))
+                else:
+                    outcome = run_synthesis(job.prepared, job.summaries, job.deadline)
+
+            with self._cond:
+                job.in_flight -= 1
+                if job.result is None:
+                    if isinstance(outcome, PipelineError) or kind == "synthesis":
+                        job.result = outcome
+                    else:
+                        job.summaries[position] = outcome
+                        job.completed += 1
+                if job.result is not None and job.in_flight == 0:
+                    self._finish(job)
+                self._cond.notify_all()
+
+    def _prune(self):
+        """Forget finished jobs past the retention window (lock held)."""
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [j.job_id for j in self._jobs.values() if j.done.is_set() and j.created < cutoff]:
+            del self._jobs[job_id]
+
+    def _finish(self, job):
+        """Release a finished job's slot and admit the client's next job (lock held)."""
+        active = self._active.get(job.client_id, [])
+        if job in active:
+            active.remove(job)
+            self._admit(job.client_id)
+        error_code = getattr(job.result, "error_code", None)
+        if error_code:
+            job.span.set_attribute("error_code", error_code)
+        close_span(job.span)
+        job.done.set()
+        for listener in self._finish_listeners:
+            try:
+                listener(job)
+            except Exception:
+                pass
@@ -0,0 +1,334 @@
+"""Output schemas for chunk and final summaries, with local JSON repair."""
+import json
+import re
+
+
+# Field spec: type, whether the model must produce it, default when missing,
+# and (for lists) the expected item type.
+CHUNK_SCHEMA = {
+    "chunk_index": {"type": int, "required": False, "default": 0},
+    "chunk_total": {"type": int, "required": False, "default": 0},
+    "chunk_summary": {"type": str, "required": True, "default": ""},
+    "key_points": {"type": list, "required": False, "default": [], "items": str},
+    "notable_quotes": {"type": list, "required": False, "default": [], "items": "quote"},
+    "claims_numbers": {"type": list, "required": False, "default": [], "items": str},
+    "verify_flags": {"type": list, "required": False, "default": [], "items": str},
+}
+
+FINAL_SCHEMA = {
+    "status": {"type": str, "required": False, "default": "ok"},
+    "video_id": {"type": str, "required": False, "default": ""},
+    "video_url": {"type": str, "required": False, "default": ""},
+    "title": {"type": str, "required": False, "default": ""},
+    "final_short_summary": {"type": str, "required": True, "default": ""},
+    "final_key_takeaways": {"type": list, "required": True, "default": [], "items": str},
+    "top_claims_numbers": {"type": list, "required": False, "default": [], "items": str},
+    "highlights": {"type": list, "required": False, "default": [], "items": "quote"},
+    "next_steps": {"type": list, "required": False, "default": [], "items": str},
+    "confidence": {"type": str, "required": False, "default": "Several claims require verification"},
+    "chunks_count": {"type": int, "required": False, "default": 0},
+}
+
+# Upper bound on how many trailing elements repair may drop before giving up
+MAX_REPAIR_STEPS = 50
+
+
+def _scan(text):
+    """
+    Walk JSON text tracking open containers and string state.
+
+    Returns:
+        Tuple (closers, in_string, escape, cut_points) where closers is the stack of
+        closing brackets still needed and cut_points are structural positions
+        (commas and opening brackets outside strings) usable for trimming.
+    """
+    closers = []
+    cut_points = []
+    in_string = False
+    escape = False
+
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == '{':
+            closers.append('}')
+            cut_points.append(i)
+        elif ch == '[':
+            closers.append(']')
+            cut_points.append(i)
+        elif ch in '}]':
+            if closers:
+                closers.pop()
+        elif ch == ',':
+            cut_points.append(i)
+
+    return closers, in_string, escape, cut_points
+
+
+def _close(text):
+    """Close an open string and any open containers at the end of text."""
+    closers, in_string, escape, _ = _scan(text)
+    if escape:
+        text = text[:-1]
+    if in_string:
+        text += '"'
+    # Drop a dangling separator left behind by truncation
+    text = re.sub(r'[\s,]*$', '', text)
+    return text + ''.join(reversed(closers))
+
+
+# Characters that can end / start a JSON value outside strings
+VALUE_END = set('"}]0123456789el')  # true and false end in e, null in l
+VALUE_START = set('"{[-0123456789tfn')
+
+
+def _fix_separators(text):
+    """
+    Fix comma mistakes outside strings: drop trailing and doubled commas, insert missing ones.
+
+    A comma is inserted only between two complete values separated by
+    whitespace (or an opening quote/bracket), e.g. '"a" "b"' or '1 2'.
+    """
+    out = []
+    in_string = False
+    escape = False
+    last = ''       # Last significant character outside strings
+    gap = False     # Whitespace seen since the last significant character
+    out_comma = -1  # Position in out of the last comma
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+                last, gap = '"', False
+            continue
+        if ch.isspace():
+            out.append(ch)
+            gap = True
+            continue
+        if ch in '}]' and last == ',':
+            # Trailing comma before a closing bracket
+            out[out_comma] = ''
+        elif ch == ',' and last in (',', '[', '{'):
+            # Doubled or leading comma
+            gap = False
+            continue
+        elif ch in VALUE_START and last in VALUE_END and (gap or ch in '"{['):
+            out.append(',')
+        if ch == ',':
+            out_comma = len(out)
+        out.append(ch)
+        if ch == '"':
+            in_string = True
+        last, gap = ch, False
+    return ''.join(out)
+
+
+def _at_end(text, error):
+    """Whether a parse error is explained by the text ending early (truncation)."""
+    if error.msg.startswith('Unterminated string'):
+        return True
+    # Only a partial number or literal may follow the error position
+    return re.fullmatch(r'[\w.+-]*', text[error.pos:].strip()) is not None
+
+
+def _trim(candidate):
+    """Cut candidate back to its last structural boundary, or '' if there is none; always shortens it."""
+    _, _, _, cut_points = _scan(candidate)
+    if not cut_points:
+        return ''
+    cut = cut_points[-1]
+    trimmed = candidate[:cut + 1] if candidate[cut] in '{[' else candidate[:cut]
+    if len(trimmed.rstrip()) >= len(candidate):
+        trimmed = candidate[:cut]
+    return trimmed.rstrip()
+
+
+def parse_json(text):
+    """
+    Parse a complete JSON object from model output, fixing only comma mistakes.
+
+    Nothing is closed or trimmed, so a truncated reply returns None.
+
+    Args:
+        text: Raw response text (markdown fences already stripped)
+
+    Returns:
+        Parsed dict or None
+    """
+    start = text.find('{')
+    if start < 0:
+        return None
+    text = text[start:]
+
+    decoder = json.JSONDecoder()
+    for candidate in (text, _fix_separators(text)):
+        try:
+            result, _ = decoder.raw_decode(candidate)
+            return result if isinstance(result, dict) else None
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def repair_json(text, truncated=False):
+    """
+    Parse JSON from model output, repairing small mistakes locally where possible.
+
+    Stray, doubled or missing commas are fixed anywhere. Closing unterminated
+    strings and containers, and dropping a trailing incomplete element (e.g.
+    a key without a value), is only done for truncated output: when the
+    reply hit max_tokens or the parse error is at the end of the text. Other
+    errors in the middle of the object are not repaired, so no fields are
+    silently lost. When the reply hit max_tokens, an unterminated string is
+    dropped rather than closed, so clipped quotes never pass as complete.
+
+    Args:
+        text: Raw response text (markdown fences already stripped)
+        truncated: True if the model stopped at max_tokens (finish_reason "length")
+
+    Returns:
+        Parsed dict or None if no JSON object could be recovered
+    """
+    parsed = parse_json(text)
+    if parsed is not None:
+        return parsed
+    start = text.find('{')
+    if start < 0:
+        return None
+    text = _fix_separators(text[start:])
+
+    try:
+        json.loads(text)
+    except json.JSONDecodeError as e:
+        if not (truncated or _at_end(text, e)):
+            return None
+
+    decoder = json.JSONDecoder()
+    candidate = text.rstrip()
+    if truncated and _scan(candidate)[1]:
+        candidate = _trim(candidate)
+    for _ in range(MAX_REPAIR_STEPS):
+        if candidate == '':
+            return None
+        try:
+            result, _ = decoder.raw_decode(_close(candidate))
+            return result if isinstance(result, dict) else None
+        except json.JSONDecodeError:
+            pass
+        candidate = _trim(candidate)
+
+    return None
+
+
+def _coerce_quote(item):
+    """Coerce a quote entry to {"time": str, "quote": str}."""
+    if isinstance(item, dict):
+        quote = str(item.get("quote", "") or "")
+        return {"time": str(item.get("time", "") or ""), "quote": quote} if quote else None
+    if isinstance(item, str):
+        match = re.match(r'\s*\[?(\d{1,2}:\d{2})\]?\s*(.*)', item)
+        if match:
+            return {"time": match.group(1), "quote": match.group(2)}
+        return {"time": "", "quote": item}
+    return None
+
+
+def _coerce(value, spec):
+    """Coerce a single field value to the type described by spec."""
+    expected = spec["type"]
+
+    if expected is list:
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            value = [value]
+        items = []
+        for item in value:
+            if spec.get("items") == "quote":
+                item = _coerce_quote(item)
+            elif isinstance(item, (dict, list)):
+                item = json.dumps(item, ensure_ascii=False)
+            elif item is not None:
+                item = str(item)
+            if item:
+                items.append(item)
+        return items
+
+    if expected is int:
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, (int, float)):
+            return int(value)
+        match = re.search(r'-?\d+', str(value))
+        return int(match.group(0)) if match else spec["default"]
+
+    if expected is str:
+        if value is None:
+            return ""
+        if isinstance(value, list):
+            return " ".join(str(item) for item in value)
+        return str(value)
+
+    return value
+
+
+def validate(result, schema, overrides=None):
+    """
+    Validate and normalize a parsed output against a schema.
+
+    Missing optional fields are filled with defaults, values are coerced to
+    the schema types, and fields known locally are taken from overrides.
+
+    Args:
+        result: Parsed output dict
+        schema: CHUNK_SCHEMA or FINAL_SCHEMA
+        overrides: Dict of field values known without the model (e.g. chunk_index)
+
+    Returns:
+        Tuple (normalized dict, list of missing required fields)
+    """
+    normalized = {}
+    missing = []
+
+    for field, spec in schema.items():
+        if overrides and field in overrides:
+            normalized[field] = overrides[field]
+            continue
+        value = result.get(field)
+        if value is None or value == "" or value == []:
+            if spec["required"]:
+                missing.append(field)
+            default = spec["default"]
+            normalized[field] = list(default) if isinstance(default, list) else default
+            continue
+        normalized[field] = _coerce(value, spec)
+
+    return normalized, missing
+
+
+def describe_schema(schema, fields=None):
+    """Render a compact field list for schema-targeted follow-up prompts."""
+    names = {int: "integer", str: "string", list: "array"}
+    lines = []
+    for field, spec in schema.items():
+        if fields is not None and field not in fields:
+            continue
+        kind = names[spec["type"]]
+        if spec.get("items") == "quote":
+            kind = 'array of {"time":"mm:ss","quote":"..."}'
+        elif spec.get("items") is str:
+            kind = "array of strings"
+        lines.append(f'"{field}": {kind}')
+    return "\n".join(lines)
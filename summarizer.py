@@ -1,8 +1,79 @@
 """Summarize chunks and synthesize final summary using OpenAI API."""
-import json
+import random
 import re
-from openai import OpenAI
-from config import get_openai_api_key
+import time
+from openai import OpenAI, RateLimitError, APIConnectionError, APIStatusError, InternalServerError
+from config import get_openai_api_key, get_hedging_enabled
+from deadline import Deadline, DeadlineExceeded, LatencyTracker, hedged_call
+from tracing import span, current_span
+from schemas import CHUNK_SCHEMA, FINAL_SCHEMA, parse_json, repair_json, validate, describe_schema
+from results import ChunkSummary, SummaryResult, dumps
+from merger import merge_chunk_summaries
+from routing import get_policy, verbosity_instruction
+
+
+CONTINUE_PROMPT = """Your previous reply was cut off. Continue the JSON exactly where it stopped. Output only the remaining characters, without repeating anything."""
+
+MISSING_FIELDS_PROMPT = """Your previous JSON is missing these fields. Return a JSON object containing ONLY these fields, using the same source material:
+
+{fields}"""
+
+# Prompts are laid out as a stable prefix (system message, schema, instructions)
+# followed by the variable payload, so providers can reuse the cached prefix
+# across calls. Bump the version whenever a template changes.
+CHUNK_PROMPT_VERSION = "chunk-v2"
+
+CHUNK_SYSTEM_MESSAGE = """You are a strict transcript chunk summarizer. Only use the text inside ---BEGIN TRANSCRIPT--- and ---END TRANSCRIPT---. Do NOT add outside knowledge, do NOT infer unstated facts. Return VALID JSON ONLY matching the schema."""
+
+CHUNK_INSTRUCTIONS = """TASK (output JSON) for the transcript below:
+
+{
+  "chunk_summary": "<1-2 sentence factual summary>",
+  "key_points": ["short bullet 1","short bullet 2", "..."],
+  "notable_quotes": [{"time":"mm:ss","quote":"..."}],
+  "claims_numbers": ["exact quoted claim or number","..."],
+  "verify_flags": ["phrase or claim to verify","..."]
+}
+
+---BEGIN TRANSCRIPT---
+
+"""
+
+SYNTHESIS_PROMPT_VERSION = "synthesis-v2"
+
+SYNTHESIS_SYSTEM_MESSAGE = """You are an expert synthesizer. Use only the provided merged chunk summaries JSON. Do NOT re-open the original transcript; rely only on chunk summaries and fields. Return VALID JSON ONLY."""
+
+SYNTHESIS_INSTRUCTIONS = """TASK (output JSON) from the merged chunk summaries below:
+
+{
+  "final_short_summary": "<2-3 sentence summary>",
+  "final_key_takeaways": ["takeaway 1","takeaway 2", "..."],
+  "top_claims_numbers": ["..."],
+  "highlights": [{"time":"mm:ss","quote":"..."}],
+  "next_steps": ["action 1","action 2","action 3"],
+  "confidence": "<All claims are transcript-supported | Most claims are transcript-supported | Several claims require verification>"
+}
+
+Here are the merged chunk summaries:
+
+"""
+
+PROMPT_VERSIONS = {"map": CHUNK_PROMPT_VERSION, "synthesis": SYNTHESIS_PROMPT_VERSION}
+
+# Callables notified after every completion as fn(stage, usage, elapsed_seconds)
+_usage_listeners = []
+
+# Observed call latencies, used to decide when to hedge
+latency_tracker = LatencyTracker()
+
+# Percentile of observed latency after which a duplicate request is sent
+HEDGE_PERCENTILE = 95
+
+# Transient errors retried with back-off when a bounded deadline replaces the SDK's retries
+RETRYABLE_ERRORS = (RateLimitError, APIConnectionError, InternalServerError)
+CALL_RETRIES = 2
+RETRY_BACKOFF_SECONDS = 0.5
+RETRY_BACKOFF_CAP_SECONDS = 8.0
 
 
 def get_openai_client():
@@ -11,169 +82,264 @@ def get_openai_client():
     api_key = get_openai_api_key()
     if not api_key:
         raise ValueError("OPENAI_API_KEY not found in environment")
-    
+
     # Create custom httpx client to avoid proxies parameter issue
     # This bypasses the internal SyncHttpxClientWrapper that has compatibility issues
     http_client = httpx.Client(timeout=60.0)
-    
+
     # Initialize OpenAI client with custom http_client
     return OpenAI(api_key=api_key, http_client=http_client, max_retries=2)
 
 
-def extract_json_from_response(text):
-    """Extract JSON from response, handling markdown code blocks."""
-    # Remove markdown code blocks if present
+def add_usage_listener(listener):
+    """Register a callable receiving (stage, usage, elapsed_seconds) for each LLM call."""
+    _usage_listeners.append(listener)
+
+
+def _notify_usage(stage, usage, elapsed):
+    """Report one call's token usage and latency to registered listeners."""
+    latency_tracker.record(stage, elapsed)
+    for listener in _usage_listeners:
+        try:
+            listener(stage, usage, elapsed)
+        except Exception:
+            pass
+
+
+def cached_tokens(usage):
+    """Prompt tokens served from the provider's prefix cache (0 if not reported)."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def _retry_delay(attempt, error):
+    """Back-off before retry attempt + 1: the server's Retry-After if given, else jittered exponential."""
+    if isinstance(error, APIStatusError):
+        try:
+            return min(float(error.response.headers.get("retry-after")), RETRY_BACKOFF_CAP_SECONDS)
+        except (TypeError, ValueError):
+            pass
+    return min(RETRY_BACKOFF_SECONDS * 2 ** attempt, RETRY_BACKOFF_CAP_SECONDS) * random.uniform(0.5, 1.0)
+
+
+def strip_code_fences(text):
+    """Remove markdown code fences from a response."""
     text = re.sub(r'```json\s*', '', text)
     text = re.sub(r'```\s*', '', text)
-    text = text.strip()
-    
-    # Try to find JSON object
-    json_match = re.search(r'\{.*\}', text, re.DOTALL)
-    if json_match:
-        return json_match.group(0)
-    return text
+    return text.strip()
 
 
-def summarize_chunk(chunk_data, retry_count=1):
+def _complete(client, messages, max_tokens, json_mode=True, stage="map", deadline=None, model="gpt-4o-mini"):
     """
-    Summarize a single chunk using OpenAI API.
-    
-    Args:
-        chunk_data: Dict with index, total, text
-        retry_count: Number of retries on failure
-    
-    Returns:
-        Dict with chunk summary JSON or None on failure
+    Run one chat completion and return (text, finish_reason).
+
+    Calls sharing a prompt template carry the same prompt_cache_key, which
+    keeps them on the same provider cache. Cached prompt tokens are recorded
+    on the call's span.
+
+    With a bounded deadline, each attempt's timeout is derived from the
+    remaining budget, and the SDK's retries are replaced by a short back-off
+    on rate limits, connection and server errors that is skipped when it
+    would outlast the budget. With hedging enabled, a duplicate request is
+    sent once the call outlives the observed p95 latency for its stage and
+    the first response wins.
     """
-    client = get_openai_client()
-    
-    chunk_prompt = f"""---BEGIN TRANSCRIPT---
+    deadline = deadline or Deadline()
+    kwargs = {"extra_body": {"prompt_cache_key": f"{PROMPT_VERSIONS.get(stage, stage)}:{model}"}}
+    if json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
 
-{chunk_data['text']}
+    def send(api_client):
+        started = time.monotonic()
+        response = api_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.0,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+        _notify_usage(stage, getattr(response, "usage", None), time.monotonic() - started)
+        return response
 
----END TRANSCRIPT---
+    def create(api_client):
+        if deadline.expires is None:
+            return send(api_client)
+        for attempt in range(CALL_RETRIES + 1):
+            try:
+                return send(api_client.with_options(timeout=deadline.timeout(), max_retries=0))
+            except RETRYABLE_ERRORS as e:
+                delay = _retry_delay(attempt, e)
+                if attempt == CALL_RETRIES or delay >= deadline.remaining():
+                    raise
+                current_span().add("backoffs")
+                time.sleep(delay)
 
+    parent = current_span()
+    with span("llm_call", stage=stage, model=model, max_tokens=max_tokens, json_mode=json_mode) as active:
+        if get_hedging_enabled():
+            hedge_after = latency_tracker.percentile(stage, HEDGE_PERCENTILE)
+            response = hedged_call(create, client, hedge_after, get_openai_client)
+        else:
+            response = create(client)
+        choice = response.choices[0]
+        active.set_attribute("finish_reason", choice.finish_reason)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            for key in ("prompt_tokens", "completion_tokens"):
+                active.set_attribute(key, getattr(usage, key, None))
+                parent.add(key, getattr(usage, key, None) or 0)
+            cached = cached_tokens(usage)
+            active.set_attribute("cached_tokens", cached)
+            parent.add("cached_tokens", cached)
+    return (choice.message.content or "").strip(), choice.finish_reason
 
 
-TASK (output JSON):
+def _request_structured(client, messages, schema, overrides, max_tokens, retry_count, stage, deadline=None,
+                        model="gpt-4o-mini"):
+    """
+    Request a schema-conforming JSON object, repairing locally before re-asking.
 
-{{
-  "chunk_index": {chunk_data['index']},
-  "chunk_total": {chunk_data['total']},
-  "chunk_summary": "<1-2 sentence factual summary>",
-  "key_points": ["short bullet 1","short bullet 2", "..."],
-  "notable_quotes": [{{"time":"mm:ss","quote":"..."}}],
-  "claims_numbers": ["exact quoted claim or number","..."],
-  "verify_flags": ["phrase or claim to verify","..."]
-}}"""
-    
-    system_message = """You are a strict transcript chunk summarizer. Only use the text inside ---BEGIN TRANSCRIPT--- and ---END TRANSCRIPT---. Do NOT add outside knowledge, do NOT infer unstated facts. Return VALID JSON ONLY matching the schema."""
-    
+    Slightly malformed output is repaired in place. A reply cut off at
+    max_tokens gets a continuation request, and only the combined text is
+    repaired. Missing required fields are then requested on their own. A
+    full retry is the last resort, and only while the deadline allows.
+
+    Returns:
+        Validated dict or None on failure
+
+    Raises:
+        DeadlineExceeded: if the request deadline runs out
+        RateLimitError: if upstream is still rate limiting after the call's back-off retries
+    """
+    deadline = deadline or Deadline()
     for attempt in range(retry_count + 1):
+        deadline.check(stage)
+        if attempt:
+            current_span().add("retries")
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": chunk_prompt}
-                ],
-                temperature=0.0,
-                max_tokens=1024,
-                response_format={"type": "json_object"}
-            )
-            
-            response_text = response.choices[0].message.content.strip()
-            json_str = extract_json_from_response(response_text)
-            result = json.loads(json_str)
-            
-            # Validate required fields
-            required_fields = ["chunk_index", "chunk_total", "chunk_summary", "key_points", 
-                             "notable_quotes", "claims_numbers", "verify_flags"]
-            if all(field in result for field in required_fields):
-                return result
-            
-        except json.JSONDecodeError:
-            if attempt < retry_count:
-                continue
-        except Exception as e:
-            if attempt < retry_count:
+            response_text, finish_reason = _complete(client, messages, max_tokens, stage=stage, deadline=deadline,
+                                                     model=model)
+            response_text = strip_code_fences(response_text)
+            parsed = parse_json(response_text)
+
+            if parsed is None and finish_reason == "length":
+                # Ask the model to finish the cut-off object instead of starting over;
+                # a repaired prefix would pass clipped quotes and dropped fields as valid
+                current_span().add("continuations")
+                tail, finish_reason = _complete(client, messages + [
+                    {"role": "assistant", "content": response_text},
+                    {"role": "user", "content": CONTINUE_PROMPT}
+                ], max_tokens, json_mode=False, stage=stage, deadline=deadline, model=model)
+                response_text = response_text + strip_code_fences(tail)
+
+            if parsed is None:
+                parsed = repair_json(response_text, truncated=finish_reason == "length")
+
+            if parsed is None:
                 continue
-    
+
+            result, missing = validate(parsed, schema, overrides)
+            if not missing:
+                return result
+
+            # Fetch only the missing required fields
+            current_span().add("field_fills")
+            fill_text, _ = _complete(client, messages + [
+                {"role": "assistant", "content": response_text},
+                {"role": "user", "content": MISSING_FIELDS_PROMPT.format(
+                    fields=describe_schema(schema, missing))}
+            ], max_tokens, stage=stage, deadline=deadline, model=model)
+            extra = repair_json(strip_code_fences(fill_text))
+            if extra:
+                result, missing = validate({**parsed, **extra}, schema, overrides)
+                if not missing:
+                    return result
+
+        except (DeadlineExceeded, RateLimitError):
+            raise
+        except Exception:
+            deadline.check(stage)
+
     return None
 
 
-def synthesize_chunks(chunks_json_array, video_id, original_url, title="", retry_count=1):
+def summarize_chunk(chunk_data, retry_count=1, deadline=None, route=None):
+    """
+    Summarize a single chunk using OpenAI API.
+
+    Args:
+        chunk_data: Dict with index, total, text
+        retry_count: Number of full retries when repair and follow-up fail
+        deadline: Deadline bounding all calls for this chunk
+        route: Route choosing model, max_tokens and verbosity (default policy route)
+
+    Returns:
+        ChunkSummary or None on failure
+    """
+    client = get_openai_client()
+    route = route or get_policy().default("map")
+
+    # Chunk position is not in the prompt; overrides fill chunk_index and chunk_total
+    chunk_prompt = CHUNK_INSTRUCTIONS + chunk_data['text'] + "\n\n---END TRANSCRIPT---"
+    system_message = CHUNK_SYSTEM_MESSAGE + verbosity_instruction(route)
+
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": chunk_prompt}
+    ]
+    overrides = {"chunk_index": chunk_data['index'], "chunk_total": chunk_data['total']}
+
+    result = _request_structured(client, messages, CHUNK_SCHEMA, overrides,
+                                 max_tokens=route.max_tokens, retry_count=retry_count, stage="map",
+                                 deadline=deadline, model=route.model)
+    return ChunkSummary.from_dict(result) if result else None
+
+
+def synthesize_chunks(chunks_json_array, video_id, original_url, title="", retry_count=1, deadline=None,
+                      route=None):
     """
     Synthesize chunk summaries into final summary.
-    
+
+    Chunk outputs are merged and deduplicated locally first, so the prompt
+    carries each repeated key point, quote or claim only once.
+
     Args:
-        chunks_json_array: List of chunk summary dicts
+        chunks_json_array: List of ChunkSummary objects
         video_id: YouTube video ID
         original_url: Original YouTube URL
         title: Video title (if available)
-        retry_count: Number of retries on failure
-    
+        retry_count: Number of full retries when repair and follow-up fail
+        deadline: Deadline bounding all synthesis calls
+        route: Route choosing model, max_tokens and verbosity (default policy route)
+
     Returns:
-        Final synthesis dict or None on failure
+        SummaryResult or None on failure
     """
     client = get_openai_client()
-    
-    chunks_json_str = json.dumps(chunks_json_array, indent=2)
-    
-    synthesis_prompt = f"""Here is the array:
+    route = route or get_policy().default("synthesis")
 
-{chunks_json_str}
+    with span("merge_chunks") as active:
+        merged = merge_chunk_summaries(chunks_json_array)
+        active.set_attribute("key_points_in", sum(len(c.key_points) for c in chunks_json_array))
+        active.set_attribute("key_points_out", len(merged.key_points))
 
+    # Per-video fields are not in the prompt; overrides fill them
+    synthesis_prompt = SYNTHESIS_INSTRUCTIONS + dumps(merged.to_dict())
+    system_message = SYNTHESIS_SYSTEM_MESSAGE + verbosity_instruction(route)
 
+    messages = [
+        {"role": "system", "content": system_message},
+        {"role": "user", "content": synthesis_prompt}
+    ]
+    overrides = {
+        "status": "ok",
+        "video_id": video_id,
+        "video_url": original_url,
+        "title": title,
+        "chunks_count": len(chunks_json_array),
+    }
 
-TASK (output JSON):
-
-{{
-  "status": "ok",
-  "video_id": "{video_id}",
-  "video_url": "{original_url}",
-  "title": "{title}",
-  "final_short_summary": "<2-3 sentence summary>",
-  "final_key_takeaways": ["takeaway 1","takeaway 2", "..."],
-  "top_claims_numbers": ["..."],
-  "highlights": [{{"time":"mm:ss","quote":"..."}}],
-  "next_steps": ["action 1","action 2","action 3"],
-  "confidence": "<All claims are transcript-supported | Most claims are transcript-supported | Several claims require verification>",
-  "chunks_count": {len(chunks_json_array)}
-}}"""
-    
-    system_message = """You are an expert synthesizer. Use only the provided chunk JSON array. Do NOT re-open the original transcript; rely only on chunk summaries and fields. Return VALID JSON ONLY."""
-    
-    for attempt in range(retry_count + 1):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": synthesis_prompt}
-                ],
-                temperature=0.0,
-                max_tokens=2048,
-                response_format={"type": "json_object"}
-            )
-            
-            response_text = response.choices[0].message.content.strip()
-            json_str = extract_json_from_response(response_text)
-            result = json.loads(json_str)
-            
-            # Validate required fields
-            required_fields = ["status", "video_id", "video_url", "title", "final_short_summary",
-                             "final_key_takeaways", "top_claims_numbers", "highlights", "next_steps",
-                             "confidence", "chunks_count"]
-            if all(field in result for field in required_fields):
-                return result
-            
-        except json.JSONDecodeError:
-            if attempt < retry_count:
-                continue
-        except Exception as e:
-            if attempt < retry_count:
-                continue
-    
-    return None
-
+    result = _request_structured(client, messages, FINAL_SCHEMA, overrides,
+                                 max_tokens=route.max_tokens, retry_count=retry_count, stage="synthesis",
+                                 deadline=deadline, model=route.model)
+    return SummaryResult.from_dict(result) if result else None
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Modules live at the repository root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+class FakeClient:
+    """Stand-in for the OpenAI client: replays (content, finish_reason) replies or raises."""
+
+    def __init__(self, replies, cached_tokens=0):
+        self.replies = list(replies)
+        self.cached_tokens = cached_tokens
+        self.calls = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def with_options(self, **options):
+        self.options = options
+        return self
+
+    def close(self):
+        pass
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        if isinstance(reply, Exception):
+            raise reply
+        content, finish_reason = reply
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=20, total_tokens=120,
+                                prompt_tokens_details=SimpleNamespace(cached_tokens=self.cached_tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content),
+                                                        finish_reason=finish_reason)], usage=usage)
+
+
+@pytest.fixture
+def rate_limit_error():
+    """Build a 429 RateLimitError, optionally carrying a Retry-After header."""
+    from openai import RateLimitError
+
+    def build(retry_after=None):
+        headers = {"retry-after": retry_after} if retry_after is not None else {}
+        response = SimpleNamespace(request=None, status_code=429, headers=headers)
+        return RateLimitError("Rate limit reached", response=response, body=None)
+    return build
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Route every summarizer call to a FakeClient built from the given replies."""
+    import summarizer
+
+    def install(replies, cached_tokens=0):
+        client = FakeClient(replies, cached_tokens)
+        monkeypatch.setattr(summarizer, "get_openai_client", lambda: client)
+        return client
+    return install
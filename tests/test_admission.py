@@ -0,0 +1,32 @@
+from admission import AdmissionController
+from main import run_chunk
+from results import PreparedTranscript
+
+
+class StubScheduler:
+    def add_finish_listener(self, listener):
+        self.listener = listener
+
+    def stats(self):
+        return {"workers": 4, "waiting_jobs": 0, "active_jobs": 0, "pending_chars": 0, "pending_calls": 0}
+
+
+def test_rate_limit_surfaces_as_api_rate_limit(fake_openai, rate_limit_error):
+    client = fake_openai([rate_limit_error()])
+    result = run_chunk({"index": 1, "total": 1, "text": "[00:01] hello"})
+    assert result.error_code == "api_rate_limit"
+    # No blind retry of a rate-limited call
+    assert len(client.calls) == 1
+
+
+def test_rate_limited_job_makes_admission_reject(fake_openai, rate_limit_error):
+    scheduler = StubScheduler()
+    admission = AdmissionController(scheduler)
+    fake_openai([rate_limit_error()])
+    job = type("Job", (), {"result": run_chunk({"index": 1, "total": 1, "text": "[00:01] hello"})})()
+    scheduler.listener(job)
+
+    prepared = PreparedTranscript("vid", "url", "x" * 100, [{"index": 1, "total": 1, "text": "x" * 100}])
+    estimate = admission.estimate(prepared)
+    assert (estimate.decision, estimate.reason) == ("reject", "rate_limited")
+    assert estimate.retry_after_seconds > 0
@@ -0,0 +1,20 @@
+import app
+
+
+def client_id(remote, headers=None):
+    with app.app.test_request_context(environ_base={"REMOTE_ADDR": remote}, headers=headers or {}):
+        return app.get_client_id()
+
+
+def test_client_is_keyed_on_remote_address(monkeypatch):
+    monkeypatch.setattr(app, "trusted_frontends", set())
+    assert client_id("10.0.0.5") == "10.0.0.5"
+    # A caller cannot pick its own fair-share identity
+    assert client_id("10.0.0.5", {"X-Client-Id": "frontend"}) == "10.0.0.5"
+
+
+def test_trusted_frontend_may_name_the_client(monkeypatch):
+    monkeypatch.setattr(app, "trusted_frontends", {"10.0.0.1"})
+    assert client_id("10.0.0.1", {"X-Client-Id": "batch"}) == "batch"
+    assert client_id("10.0.0.1") == "10.0.0.1"
+    assert client_id("10.0.0.9", {"X-Client-Id": "batch"}) == "10.0.0.9"
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pytest
+
+from archive import ArchiveWriter, TranscriptArchive, reprocess
+from transcript_extractor import clean_transcript
+
+SNIPPETS = {
+    "vid_b": [{"start": 0.0, "text": "Hello <b>world</b>"}, {"start": 61.5, "text": "naïve café ♪ résumé"}],
+    "vid_a": [{"start": 3.0, "text": "first"}, {"start": 4.0, "text": ""}, {"start": 5.0, "text": "third"}],
+}
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = tmp_path / "transcripts.arc"
+    with ArchiveWriter(path) as writer:
+        writer.add("vid_a", [{"start": 0.0, "text": "replaced"}])
+        for video_id, snippets in SNIPPETS.items():
+            writer.add(video_id, snippets)
+        writer.add("empty", [])
+        assert len(writer) == 3
+    return path
+
+
+def test_round_trip(archive_path):
+    archive = TranscriptArchive(archive_path)
+    assert archive.video_ids() == ["empty", "vid_a", "vid_b"]
+    for video_id, snippets in SNIPPETS.items():
+        transcript = archive.get(video_id)
+        assert [(s.start, s.text) for s in transcript] == [(s["start"], s["text"]) for s in snippets]
+        assert clean_transcript(transcript) == clean_transcript(snippets)
+    archive.close()
+
+
+def test_empty_and_missing_videos(archive_path):
+    archive = TranscriptArchive(archive_path)
+    assert len(archive.get("empty")) == 0
+    assert clean_transcript(archive.get("empty")) == ""
+    assert "missing" not in archive
+    assert archive.get("missing") is None
+    archive.close()
+
+
+def test_re_added_video_replaces_the_earlier_entry(archive_path):
+    archive = TranscriptArchive(archive_path)
+    assert len(archive) == 3
+    assert [s.text for s in archive.get("vid_a")] == ["first", "", "third"]
+    archive.close()
+
+
+def test_truncated_or_foreign_files_raise_value_error(archive_path, tmp_path):
+    data = archive_path.read_bytes()
+    for name, content in [("tiny", data[:10]), ("cut", data[:-5]), ("empty", b""), ("foreign", b"x" * 100)]:
+        path = tmp_path / name
+        path.write_bytes(content)
+        with pytest.raises(ValueError):
+            TranscriptArchive(path)
+
+
+def test_reprocess_with_one_worker(archive_path):
+    output = io.StringIO()
+    totals = reprocess(archive_path, target_chars=50, overlap_chars=0, workers=1, output=output)
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [line["video_id"] for line in lines] == ["empty", "vid_a", "vid_b"]
+    assert totals["videos"] == 3
+    assert totals["chunks"] == sum(len(line["chunks"]) for line in lines)
+    assert totals["transcript_chars"] == sum(len(clean_transcript(s)) for s in SNIPPETS.values())
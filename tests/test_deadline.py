@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from openai import RateLimitError
+
+import deadline
+import summarizer
+from deadline import Deadline, DeadlineExceeded, hedged_call
+
+REPLY = (json.dumps({"chunk_summary": "s"}), "stop")
+
+
+class Client:
+    def __init__(self, name, delay=0.0):
+        self.name, self.delay, self.closed = name, delay, False
+
+    def close(self):
+        self.closed = True
+
+
+def slow_call(client):
+    time.sleep(client.delay)
+    return client.name
+
+
+def test_deadline_check_and_timeout():
+    assert Deadline().timeout() == 60.0
+    assert Deadline(5).timeout() <= 5
+    with pytest.raises(DeadlineExceeded):
+        Deadline(0).check("map")
+
+
+def test_unhedged_call_runs_inline_on_given_client():
+    caller = threading.current_thread()
+    seen = []
+
+    def call(client):
+        seen.append((client, threading.current_thread()))
+        return "ok"
+
+    client = Client("primary")
+    assert hedged_call(call, client, None, lambda: pytest.fail("no hedge client needed")) == "ok"
+    assert seen == [(client, caller)]
+    assert not client.closed
+
+
+def factory_of(*delays):
+    clients = []
+
+    def factory():
+        clients.append(Client(f"attempt{len(clients)}", delays[len(clients)]))
+        return clients[-1]
+    return factory, clients
+
+
+def test_slow_call_is_hedged_and_both_clients_closed():
+    factory, clients = factory_of(0.5, 0.0)
+    assert hedged_call(slow_call, Client("caller"), 0.05, factory) == "attempt1"
+    assert len(clients) == 2
+    # The losing original is abandoned by closing its client
+    assert all(client.closed for client in clients)
+
+
+def test_fast_call_is_not_hedged():
+    factory, clients = factory_of(0.0)
+    assert hedged_call(slow_call, Client("caller"), 0.5, factory) == "attempt0"
+    assert len(clients) == 1 and clients[0].closed
+
+
+def test_hedge_timer_starts_when_the_call_runs(monkeypatch):
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(deadline, "_hedge_pool", pool)
+    pool.submit(time.sleep, 0.3)
+    factory, clients = factory_of(0.0)
+    # Queued behind the busy worker for longer than hedge_after, yet no hedge fires
+    assert hedged_call(slow_call, Client("caller"), 0.1, factory) == "attempt0"
+    assert len(clients) == 1
+    pool.shutdown()
+
+
+def test_bounded_deadline_backs_off_on_rate_limit(fake_openai, rate_limit_error, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(summarizer.time, "sleep", sleeps.append)
+    client = fake_openai([rate_limit_error("1"), REPLY])
+    text, _ = summarizer._complete(client, [], 100, deadline=Deadline(30))
+    assert json.loads(text) == {"chunk_summary": "s"}
+    assert sleeps == [1.0]
+    assert client.options["max_retries"] == 0
+
+
+def test_back_off_never_outlasts_the_deadline(fake_openai, rate_limit_error, monkeypatch):
+    monkeypatch.setattr(summarizer.time, "sleep", lambda seconds: pytest.fail("slept past the deadline"))
+    client = fake_openai([rate_limit_error("5"), REPLY])
+    with pytest.raises(RateLimitError):
+        summarizer._complete(client, [], 100, deadline=Deadline(2))
+    assert len(client.calls) == 1
@@ -0,0 +1,84 @@
+import pytest
+
+import worker
+from job_queue import JobQueue, SQLiteJobQueue
+from results import ChunkSummary
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteJobQueue(tmp_path / "jobs.db", max_attempts=2)
+
+
+def test_lease_hides_task_until_acked(queue):
+    queue.put("job", "map", {"position": 0})
+    lease = queue.lease(["map"], "w1", 60)
+    assert (lease.job_id, lease.stage, lease.payload, lease.attempts) == ("job", "map", {"position": 0}, 1)
+    assert queue.lease(["map"], "w2", 60) is None
+    assert queue.lease(["fetch"], "w2", 60) is None
+    assert queue.ack(lease)
+    assert queue.lease(["map"], "w2", 60) is None
+
+
+def test_duplicate_put_is_ignored(queue):
+    queue.put("job", "reduce", {})
+    queue.put("job", "reduce", {})
+    assert queue.ack(queue.lease(["reduce"], "w1", 60))
+    assert queue.lease(["reduce"], "w1", 60) is None
+
+
+def test_expired_lease_is_redelivered_and_old_owner_loses_it(queue):
+    queue.put("job", "map", {})
+    first = queue.lease(["map"], "w1", -1)
+    second = queue.lease(["map"], "w2", 60)
+    assert (second.task_id, second.attempts) == (first.task_id, 2)
+    assert not queue.heartbeat(first, 60)
+    assert not queue.ack(first)
+    assert queue.ack(second)
+
+
+def test_expired_lease_is_buried_after_max_attempts(queue):
+    queue.put("job", "map", {})
+    queue.put("other", "map", {})
+    queue.lease(["map"], "w1", -1)
+    queue.lease(["map"], "w1", -1)
+    # The expired task is buried; the next ready task is leased instead
+    lease = queue.lease(["map"], "w2", 60)
+    assert lease.job_id == "other"
+    assert queue.get_failure("job") == "Lease expired after 2 attempts"
+    assert worker.job_status(queue, "job")["error_code"] == "unknown_error"
+    assert queue.get_failure("other") is None
+
+
+def test_nack_retries_then_buries(queue):
+    queue.put("job", "map", {})
+    assert queue.nack(queue.lease(["map"], "w1", 60), "boom", retry_delay=0)
+    assert not queue.nack(queue.lease(["map"], "w1", 60), "boom", retry_delay=0)
+    assert queue.lease(["map"], "w1", 60) is None
+    assert queue.get_failure("job") == "boom"
+
+
+def test_count_results_by_prefix(queue):
+    queue.set_result("job", "chunk:000000", {})
+    queue.set_result("job", "chunk:000001", {})
+    queue.set_result("job", "prepared", {})
+    queue.set_result("other", "chunk:000000", {})
+    assert queue.count_results("job", "chunk:") == 2
+
+
+def test_last_map_task_enqueues_reduce_without_loading_results(queue, monkeypatch):
+    summary = ChunkSummary(chunk_index=1, chunk_total=2, chunk_summary="s")
+    monkeypatch.setattr(worker, "run_chunk", lambda chunk, route=None: summary)
+    monkeypatch.setattr(queue, "get_results", lambda *args: pytest.fail("map stage loaded every summary"))
+    for position in range(2):
+        worker.handle_map(queue, "job", {"position": position, "chunk": {}, "chunks_count": 2})
+        assert (queue.lease(["reduce"], "w1", 60) is not None) == (position == 1)
+
+
+def test_incomplete_backend_fails_at_creation():
+    class PartialQueue(JobQueue):
+        def put(self, job_id, stage, payload, key=""):
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        PartialQueue()
@@ -0,0 +1,59 @@
+import pytest
+
+from library import Library, segment_transcript
+from results import ChunkSummary, PreparedTranscript, Quote, SummaryResult
+
+TRANSCRIPT = "[00:05] welcome to the show [01:30] solar panels cost less every year [02:10] batteries store the power"
+
+
+def run(video_id, takeaway, transcript=TRANSCRIPT):
+    chunks = [{"index": 1, "total": 2, "text": "[00:05] welcome to the show"},
+              {"index": 2, "total": 2, "text": "[01:30] solar panels cost less every year [02:10] batteries"}]
+    prepared = PreparedTranscript(video_id, f"https://youtu.be/{video_id}", transcript, chunks)
+    summaries = [
+        ChunkSummary(1, 2, "intro", key_points=["greeting the audience"]),
+        ChunkSummary(2, 2, "energy", key_points=["photovoltaic prices drop"], claims_numbers=["costs fell 90%"],
+                     notable_quotes=[Quote("", "the grid will change")]),
+    ]
+    result = SummaryResult(video_id, prepared.url, f"Video {video_id}", "A talk about energy",
+                           final_key_takeaways=[takeaway], highlights=[Quote("02:10", "batteries store the power")])
+    return prepared, summaries, result
+
+
+@pytest.fixture
+def library(tmp_path):
+    return Library(tmp_path / "library.db")
+
+
+def test_second_run_replaces_the_first(library):
+    library.add_run(*run("vid1", "wind turbines are cheap"))
+    assert [hit.kind for hit in library.search("wind turbines").hits] == ["takeaway"]
+    library.add_run(*run("vid1", "tidal energy is next"))
+    assert library.search("wind turbines").hits == []
+    hits = library.search("tidal").hits
+    assert [(hit.video_id, hit.kind) for hit in hits] == [("vid1", "takeaway")]
+    assert library._conn().execute("SELECT COUNT(*) FROM chunk_summaries").fetchone()[0] == 2
+
+
+def test_fts_operators_in_queries_are_quoted(library):
+    library.add_run(*run("vid1", "solar is not expensive"))
+    for query in ['NOT solar', 'solar NOT', '"solar', 'sol*', 'solar AND OR', 'energy) (', 'NEAR(solar']:
+        library.search(query)
+    assert library.search("NOT expensive").hits[0].kind == "takeaway"
+    assert library.search('"solar').hits
+    assert library.search("***").hits == []
+
+
+def test_hits_are_attributed_to_timestamps(library):
+    library.add_run(*run("vid1", "renewables win"))
+    times = {(hit.kind, hit.time) for hit in library.search("photovoltaic").hits}
+    # Chunk-level entries take their chunk's first timestamp
+    assert times == {("key_point", "01:30")}
+    assert ("quote", "01:30") in {(hit.kind, hit.time) for hit in library.search("grid").hits}
+    assert ("quote", "02:10") in {(hit.kind, hit.time) for hit in library.search("batteries").hits}
+    assert ("transcript", "00:05") in {(hit.kind, hit.time) for hit in library.search("solar").hits}
+
+
+def test_segment_transcript_starts_segments_at_timestamps():
+    assert segment_transcript(TRANSCRIPT)[0][0] == "00:05"
+    assert segment_transcript("no stamps here") == [("", "no stamps here")]
@@ -0,0 +1,46 @@
+from merger import dedupe, merge_chunk_summaries
+from results import ChunkSummary, Quote
+
+
+def test_near_duplicates_are_merged_keeping_the_longest():
+    kept = dedupe(["The speaker explains compound interest", "The speaker explains compound interest."
+                   " in detail", "Unrelated point about housing"])
+    assert kept == ["The speaker explains compound interest. in detail", "Unrelated point about housing"]
+
+
+def test_claims_differing_in_numbers_are_kept_apart():
+    entries = ["Revenue grew 10% in 2023", "Revenue grew 20% in 2023", "The company has 500 employees",
+               "The company has 5000 employees"]
+    assert dedupe(entries) == entries
+
+
+def test_claims_differing_in_negation_are_kept_apart():
+    entries = ["Do not invest in crypto", "Do invest in crypto"]
+    assert dedupe(entries) == entries
+
+
+def test_exact_only_mode_keeps_near_duplicates():
+    entries = ["Interest rates rose sharply this year", "Interest rates rose sharply this year!!"]
+    assert dedupe(entries, fuzzy=False) == ["Interest rates rose sharply this year!!"]
+    entries = ["Interest rates rose sharply this year", "Interest rates rose very sharply this year"]
+    assert dedupe(entries, fuzzy=False) == entries
+
+
+def test_repeats_in_adjacent_chunks_do_not_outrank_spread_entries():
+    # "overlap" only repeats in neighbouring chunks 1 and 2; "theme" recurs in chunks 1 and 3
+    entries = ["overlap point", "theme point", "overlap point", "other point", "theme point", "last point"]
+    chunks = [1, 1, 2, 2, 3, 4]
+    assert dedupe(entries, limit=1, chunks=chunks) == ["theme point"]
+
+
+def test_merge_keeps_exact_claims():
+    summaries = [
+        ChunkSummary(1, 2, "a", key_points=["Rates went up"], claims_numbers=["Revenue grew 10% in 2023"],
+                     notable_quotes=[Quote("00:10", "We will hike")]),
+        ChunkSummary(2, 2, "b", key_points=["Rates went up"], claims_numbers=["Revenue grew 20% in 2023"],
+                     notable_quotes=[Quote("00:10", "We will hike")]),
+    ]
+    merged = merge_chunk_summaries(summaries)
+    assert merged.key_points == ["Rates went up"]
+    assert merged.claims_numbers == ["Revenue grew 10% in 2023", "Revenue grew 20% in 2023"]
+    assert len(merged.notable_quotes) == 1
@@ -0,0 +1,62 @@
+import json
+import os
+
+import summarizer
+from admission import AdmissionController
+from results import ChunkSummary
+from summarizer import (CHUNK_INSTRUCTIONS, CHUNK_SYSTEM_MESSAGE, SYNTHESIS_INSTRUCTIONS, SYNTHESIS_SYSTEM_MESSAGE,
+                        summarize_chunk, synthesize_chunks)
+
+CHUNK_REPLY = (json.dumps({"chunk_summary": "s"}), "stop")
+FINAL_REPLY = (json.dumps({"final_short_summary": "s", "final_key_takeaways": ["t"]}), "stop")
+
+
+class StubScheduler:
+    def add_finish_listener(self, listener):
+        pass
+
+    def stats(self):
+        return {"workers": 1, "waiting_jobs": 0, "active_jobs": 0, "pending_chars": 0, "pending_calls": 0}
+
+
+def prompt(call):
+    """The request as sent: system message, then user message."""
+    system, user = call["messages"]
+    return system["content"] + "\n" + user["content"]
+
+
+def shared_prefix(first, second):
+    return os.path.commonprefix([prompt(first), prompt(second)])
+
+
+def test_chunk_prompts_share_the_stable_prefix(fake_openai):
+    client = fake_openai([CHUNK_REPLY])
+    summarize_chunk({"index": 1, "total": 9, "text": "[00:01] first video chunk"})
+    summarize_chunk({"index": 7, "total": 8, "text": "[42:00] another video entirely"})
+    first, second = client.calls
+    assert shared_prefix(first, second) == CHUNK_SYSTEM_MESSAGE + "\n" + CHUNK_INSTRUCTIONS + "["
+    assert first["extra_body"] == second["extra_body"]
+
+
+def test_synthesis_prompts_share_the_stable_prefix(fake_openai):
+    client = fake_openai([FINAL_REPLY])
+    synthesize_chunks([ChunkSummary(1, 1, "alpha")], "vid1", "https://youtu.be/vid1", "Title one")
+    synthesize_chunks([ChunkSummary(1, 2, "beta"), ChunkSummary(2, 2, "gamma")], "vid2", "https://youtu.be/vid2")
+    first, second = client.calls
+    # Per-video values stay out of the prompt, so the prefix runs into the payload
+    assert shared_prefix(first, second).startswith(SYNTHESIS_SYSTEM_MESSAGE + "\n" + SYNTHESIS_INSTRUCTIONS)
+    assert "vid1" not in prompt(first)
+
+
+def test_cached_tokens_reach_api_stats(fake_openai, monkeypatch):
+    import app
+    admission = AdmissionController(StubScheduler())
+    monkeypatch.setattr(app, "admission", admission)
+    monkeypatch.setattr(summarizer, "_usage_listeners", [admission.record_usage])
+    fake_openai([CHUNK_REPLY], cached_tokens=80)
+    summarize_chunk({"index": 1, "total": 1, "text": "[00:01] hello"})
+
+    usage = app.app.test_client().get("/api/stats").get_json()["usage"]
+    assert (usage["map"]["calls"], usage["map"]["cached_calls"]) == (1, 1)
+    assert (usage["map"]["prompt_tokens"], usage["map"]["cached_tokens"]) == (100, 80)
+    assert usage["map"]["cache_hit_rate"] == 0.8
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+import main
+from deadline import Deadline
+from results import ChunkSummary, PreparedTranscript
+from routing import RoutingPolicy, verbosity_instruction
+
+POLICY = RoutingPolicy(map_model="full", fast_map_model="fast", long_video_chunks=12,
+                       long_transcript_chars=150000, tight_deadline_seconds=90)
+
+
+def test_short_video_with_plenty_of_time_keeps_defaults():
+    routes = POLICY.plan(3, 20000, Deadline(300))
+    assert (routes["map"].model, routes["map"].verbosity) == ("full", "standard")
+    assert routes["synthesis"].verbosity == "standard"
+    assert verbosity_instruction(routes["map"]) == ""
+
+
+@pytest.mark.parametrize("chunks, chars", [(12, 20000), (3, 150000)])
+def test_long_video_moves_map_to_fast_tier(chunks, chars):
+    routes = POLICY.plan(chunks, chars, Deadline())
+    assert (routes["map"].model, routes["map"].max_tokens) == ("fast", 600)
+    assert (routes["map"].verbosity, routes["map"].reason) == ("brief", "long_video")
+    assert routes["synthesis"].verbosity == "standard"
+    assert verbosity_instruction(routes["map"]).startswith(" Be concise")
+
+
+def test_tight_deadline_is_brief_in_both_stages():
+    routes = POLICY.plan(3, 20000, Deadline(30))
+    assert (routes["map"].model, routes["map"].verbosity, routes["map"].reason) == ("fast", "brief", "tight_deadline")
+    assert (routes["synthesis"].verbosity, routes["synthesis"].reason) == ("brief", "tight_deadline")
+
+
+def test_routes_are_reported_in_metadata(fake_openai, monkeypatch):
+    monkeypatch.setattr(main, "index_run", lambda *args: None)
+    client = fake_openai([(json.dumps({"final_short_summary": "s", "final_key_takeaways": ["t"]}), "stop")])
+    routes = POLICY.plan(12, 20000, Deadline(30))
+    prepared = PreparedTranscript("vid", "url", "text", [{"index": 1, "total": 1, "text": "text"}], routes)
+    result = main.run_synthesis(prepared, [ChunkSummary(1, 1, "summary")])
+    assert result.metadata["routing"]["map"]["model"] == "fast"
+    assert result.metadata["routing"]["synthesis"]["verbosity"] == "brief"
+    assert client.calls[0]["messages"][0]["content"].endswith(verbosity_instruction(routes["synthesis"]))
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+import scheduler
+from results import PreparedTranscript
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Record dispatched calls as (video_id, kind) in order."""
+    calls = []
+    lock = threading.Lock()
+
+    def run_chunk(chunk, deadline=None, route=None):
+        with lock:
+            calls.append((chunk["video_id"], "chunk"))
+        return "summary"
+
+    def run_synthesis(prepared, summaries, deadline=None):
+        with lock:
+            calls.append((prepared.video_id, "synthesis"))
+        return "result"
+
+    monkeypatch.setattr(scheduler, "run_chunk", run_chunk)
+    monkeypatch.setattr(scheduler, "run_synthesis", run_synthesis)
+    return calls
+
+
+def prepared(video_id, chunks, chars=1000):
+    chunk_list = [{"video_id": video_id, "text": "x" * chars} for _ in range(chunks)]
+    return PreparedTranscript(video_id, "url", "x" * chars * chunks, chunk_list)
+
+
+def run_all(fair, submissions):
+    """Queue every (client, prepared) before the single worker starts, then wait for all jobs."""
+    fair._start = lambda: None
+    jobs = [fair.submit(client_id, job) for client_id, job in submissions]
+    del fair._start
+    fair._start()
+    for job in jobs:
+        assert job.done.wait(5)
+    return jobs
+
+
+def finished_at(calls, video_id):
+    return calls.index((video_id, "synthesis"))
+
+
+def test_shortest_job_first_within_a_client(calls):
+    fair = scheduler.FairScheduler(workers=1, per_client_jobs=1)
+    # "first" takes the client's only slot; the two waiting jobs are admitted shortest first
+    run_all(fair, [("a", prepared("first", 1)), ("a", prepared("long", 3)), ("a", prepared("short", 1))])
+    assert [video_id for video_id, kind in calls if kind == "synthesis"] == ["first", "short", "long"]
+
+
+def test_per_client_job_limit(calls):
+    fair = scheduler.FairScheduler(workers=1, per_client_jobs=1)
+    fair._start = lambda: None
+    for video_id in ("one", "two", "three"):
+        fair.submit("a", prepared(video_id, 2))
+    stats = fair.stats()
+    assert (stats["active_jobs"], stats["waiting_jobs"]) == (1, 2)
+    del fair._start
+    fair._start()
+    for job in list(fair._jobs.values()):
+        assert job.done.wait(5)
+    # Jobs of one client never interleave when only one may be active
+    started = [video_id for video_id, _ in calls]
+    assert started == sorted(started, key=started.index)
+    assert len(set(started[:3])) == 1
+
+
+def test_short_job_overtakes_a_long_batch(calls):
+    fair = scheduler.FairScheduler(workers=1, per_client_jobs=2)
+    run_all(fair, [("batch", prepared("batch1", 6)), ("batch", prepared("batch2", 6)), ("web", prepared("web", 1))])
+    assert finished_at(calls, "web") <= 2
+    assert finished_at(calls, "web") < finished_at(calls, "batch1")
+
+
+def test_weighted_virtual_time(calls):
+    fair = scheduler.FairScheduler(workers=1, per_client_jobs=1, weights={"heavy": 3.0})
+    run_all(fair, [("heavy", prepared("heavy", 8)), ("light", prepared("light", 8))])
+    first = [video_id for video_id, kind in calls[:8]]
+    assert first.count("heavy") >= 5
+    assert first.count("light") >= 1
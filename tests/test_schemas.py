@@ -0,0 +1,80 @@
+from schemas import parse_json, repair_json, validate, CHUNK_SCHEMA
+
+
+def test_valid_json_is_returned_unchanged():
+    assert repair_json('{"chunk_summary": "x", "key_points": ["a"]}') == {"chunk_summary": "x", "key_points": ["a"]}
+
+
+def test_trailing_comma_inside_array_mid_object():
+    text = '{"chunk_summary":"x","key_points":["a",],"claims_numbers":["c"]}'
+    assert repair_json(text) == {"chunk_summary": "x", "key_points": ["a"], "claims_numbers": ["c"]}
+
+
+def test_trailing_comma_keeps_following_fields():
+    text = '{"chunk_summary":"x","key_points":["a",],"claims_numbers":"c"}'
+    assert repair_json(text) == {"chunk_summary": "x", "key_points": ["a"], "claims_numbers": "c"}
+
+
+def test_doubled_comma_keeps_every_element():
+    assert repair_json('{"values": [1, 2,, 3]}') == {"values": [1, 2, 3]}
+
+
+def test_trailing_comma_before_closing_brace():
+    assert repair_json('{"a": 1, "b": 2,}') == {"a": 1, "b": 2}
+
+
+def test_missing_comma_between_values():
+    assert repair_json('{"a": ["x" "y"] "b": 2}') == {"a": ["x", "y"], "b": 2}
+
+
+def test_commas_inside_strings_are_untouched():
+    assert repair_json('{"a": "x,, y,]", "b": [1,]}') == {"a": "x,, y,]", "b": [1]}
+
+
+def test_mid_object_error_is_not_treated_as_truncation():
+    # A broken value in the middle must not silently drop the fields after it
+    assert repair_json('{"chunk_summary": "x", "key_points": [:], "claims_numbers": ["c"]}') is None
+
+
+def test_truncated_string_and_containers_are_closed():
+    assert repair_json('{"chunk_summary": "x", "key_points": ["a", "b') == {"chunk_summary": "x", "key_points": ["a", "b"]}
+
+
+def test_truncated_partial_literal_is_dropped():
+    assert repair_json('{"a": 1, "b": tru') == {"a": 1}
+
+
+def test_truncated_dangling_key_is_dropped():
+    assert repair_json('{"a": 1, "b"') == {"a": 1}
+
+
+def test_truncation_ending_at_open_bracket_makes_progress():
+    assert repair_json('{"a": 1, "b": [', truncated=True) == {"a": 1, "b": []}
+    assert repair_json('{"a": 1, "b": [{"c": ', truncated=True) == {"a": 1, "b": [{}]}
+
+
+def test_finish_reason_length_allows_trimming_mid_object_errors():
+    assert repair_json('{"a": 1, "b": [:', truncated=True) == {"a": 1, "b": []}
+
+
+def test_no_object_returns_none():
+    assert repair_json('no json here') is None
+    assert repair_json('[1, 2]') is None
+
+
+def test_validate_fills_defaults_and_reports_missing():
+    result, missing = validate({"key_points": "one"}, CHUNK_SCHEMA, {"chunk_index": 2})
+    assert missing == ["chunk_summary"]
+    assert result["key_points"] == ["one"]
+    assert result["chunk_index"] == 2
+
+
+def test_max_tokens_cut_drops_unterminated_string():
+    text = '{"chunk_summary": "x", "notable_quotes": [{"time": "01:00", "quote": "we wi'
+    assert repair_json(text, truncated=True) == {"chunk_summary": "x", "notable_quotes": [{"time": "01:00"}]}
+    assert repair_json('{"chunk_summary": "x", "key_points": ["a", "b', truncated=True) == {"chunk_summary": "x", "key_points": ["a"]}
+
+
+def test_parse_json_never_closes_or_trims():
+    assert parse_json('{"a": [1, 2,]}') == {"a": [1, 2]}
+    assert parse_json('{"a": 1, "b": "cut') is None
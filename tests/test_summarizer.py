@@ -0,0 +1,23 @@
+from summarizer import summarize_chunk
+
+CHUNK = {"index": 1, "total": 1, "text": "[01:00] we will win, three times over"}
+
+
+def test_truncated_reply_is_continued_not_clipped(fake_openai):
+    client = fake_openai([
+        ('{"chunk_summary": "The speaker discusses winning", '
+         '"notable_quotes": [{"time": "01:00", "quote": "we wi', "length"),
+        ('ll win"}], "claims_numbers": ["three times"], "verify_flags": ["three times"]}', "stop"),
+    ])
+    summary = summarize_chunk(CHUNK)
+    assert len(client.calls) == 2
+    assert [(q.time, q.quote) for q in summary.notable_quotes] == [("01:00", "we will win")]
+    assert summary.claims_numbers == ["three times"]
+    assert summary.verify_flags == ["three times"]
+
+
+def test_complete_reply_needs_no_follow_up(fake_openai):
+    client = fake_openai([('{"chunk_summary": "The speaker discusses winning"}', "stop")])
+    summary = summarize_chunk(CHUNK)
+    assert len(client.calls) == 1
+    assert summary.chunk_summary == "The speaker discusses winning"
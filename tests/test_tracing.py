@@ -0,0 +1,64 @@
+import json
+import threading
+
+import scheduler
+from deadline import Deadline
+from results import PreparedTranscript
+from tracing import close_span, open_span, span, start_trace
+
+
+def exported(sink):
+    with open(sink, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    return [[s["name"] for s in r["resourceSpans"][0]["scopeSpans"][0]["spans"]] for r in records]
+
+
+def test_trace_exports_once_when_root_ends(tmp_path):
+    sink = tmp_path / "traces.jsonl"
+    with start_trace("request", sink=str(sink)):
+        with span("fetch"):
+            pass
+        with span("map"):
+            pass
+    assert exported(sink) == [["request", "fetch", "map"]]
+
+
+def test_open_span_delays_export_until_closed(tmp_path):
+    sink = tmp_path / "traces.jsonl"
+    with start_trace("request", sink=str(sink)):
+        job = open_span("job")
+    assert not sink.exists()
+
+    with span("ignored_outside_trace"):
+        pass
+    close_span(job)
+    assert exported(sink) == [["request", "job"]]
+
+
+def test_timed_out_request_exports_job_once_finished(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def run_chunk(chunk, deadline=None, route=None):
+        release.wait(5)
+        with span("chunk"):
+            return "summary"
+
+    def run_synthesis(prepared, summaries, deadline=None):
+        with span("synthesis"):
+            return "result"
+
+    monkeypatch.setattr(scheduler, "run_chunk", run_chunk)
+    monkeypatch.setattr(scheduler, "run_synthesis", run_synthesis)
+    sink = tmp_path / "traces.jsonl"
+    fair = scheduler.FairScheduler(workers=2)
+    prepared = PreparedTranscript("vid", "url", "text", [{"text": "a"}, {"text": "b"}])
+
+    with start_trace("request", sink=str(sink)):
+        job = fair.submit("client", prepared, Deadline(30))
+        # The request stops waiting while the job is still queued
+        assert not job.done.wait(0.05)
+    assert not sink.exists()
+
+    release.set()
+    assert job.done.wait(5)
+    assert exported(sink) == [["request", "job", "chunk", "chunk", "synthesis"]]
@@ -0,0 +1,132 @@
+import json
+import threading
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+import transcript_extractor
+from deadline import Deadline, DeadlineExceeded
+from http_replay import RecordingSession, ReplaySession
+from transcript_extractor import TranscriptFetcher, TranscriptFetchError
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    # Nothing recorded: every request fails like a network error
+    path = tmp_path / "cassette.jsonl"
+    path.write_text("")
+    return str(path)
+
+
+def test_fetches_from_request_threads_reuse_pool_sessions(cassette):
+    sessions = []
+
+    def session_factory():
+        sessions.append(ReplaySession(cassette))
+        return sessions[-1]
+
+    fetcher = TranscriptFetcher(concurrency=1, fetch_workers=1, retries=0, session_factory=session_factory)
+    errors = []
+
+    def request():
+        try:
+            fetcher.fetch("abc")
+        except TranscriptFetchError as e:
+            errors.append(e)
+
+    for _ in range(5):
+        thread = threading.Thread(target=request)
+        thread.start()
+        thread.join()
+    fetcher.close()
+    assert len(errors) == 5
+    assert len(sessions) == 1
+
+
+def test_retry_back_off_stops_at_the_deadline(cassette, monkeypatch):
+    monkeypatch.setattr(transcript_extractor.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(transcript_extractor.time, "sleep", lambda seconds: pytest.fail("slept past the deadline"))
+    fetcher = TranscriptFetcher(retries=5, backoff=10, session_factory=lambda: ReplaySession(cassette))
+    with pytest.raises(TranscriptFetchError, match="after 1 attempts"):
+        fetcher.fetch("abc", Deadline(5))
+    fetcher.close()
+
+
+def test_waiting_for_a_slow_fetch_stops_at_the_deadline(cassette, monkeypatch):
+    fetcher = TranscriptFetcher(session_factory=lambda: ReplaySession(cassette))
+    monkeypatch.setattr(fetcher, "_fetch", lambda video_id, deadline=None: time.sleep(1))
+    with pytest.raises(DeadlineExceeded):
+        fetcher.fetch("abc", Deadline(0.05))
+    fetcher.close()
+
+
+def test_unclaimed_prefetches_are_evicted(cassette):
+    fetcher = TranscriptFetcher(retries=0, prefetch_ttl=0.0, session_factory=lambda: ReplaySession(cassette))
+    fetcher.prefetch(["a", "b"])
+    assert len(fetcher._pending) == 2
+    fetcher.prefetch(["c"])
+    assert list(fetcher._pending) == ["c"]
+    fetcher.close()
+
+
+def test_on_demand_fetch_does_not_queue_behind_prefetches(cassette, monkeypatch):
+    release = threading.Event()
+    fetcher = TranscriptFetcher(concurrency=1, session_factory=lambda: ReplaySession(cassette))
+    real_fetch = fetcher._fetch
+    monkeypatch.setattr(fetcher, "_fetch", lambda video_id, deadline=None:
+                        release.wait(5) if video_id.startswith("slow") else real_fetch(video_id, deadline))
+    fetcher.prefetch(["slow1", "slow2"])
+    with pytest.raises(TranscriptFetchError):
+        fetcher.fetch("abc", Deadline(2))
+    release.set()
+    fetcher.close()
+
+
+class FakeYouTube(BaseAdapter):
+    """Serves the watch page, innertube player and timedtext responses for any video."""
+
+    def send(self, request, **kwargs):
+        if "/watch?" in request.url:
+            body = '<script>ytcfg.set({"INNERTUBE_API_KEY": "test-key"})</script>'
+        elif "/youtubei/v1/player" in request.url:
+            video_id = json.loads(request.body)["videoId"]
+            body = json.dumps({"playabilityStatus": {"status": "OK"}, "captions": {"playerCaptionsTracklistRenderer": {
+                "captionTracks": [{"baseUrl": f"https://www.youtube.com/api/timedtext?v={video_id}&lang=en",
+                                   "name": {"runs": [{"text": "English"}]}, "languageCode": "en"}],
+                "translationLanguages": []}}})
+        else:
+            body = ('<transcript><text start="0.5" dur="2">hello &amp;amp; welcome</text>'
+                    '<text start="61" dur="3">second line</text></transcript>')
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "text/html; charset=utf-8"
+        response._content = body.encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def test_recorded_cassette_replays_a_transcript_offline(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+
+    def recording_session():
+        session = RecordingSession(path)
+        session.mount("https://", FakeYouTube())
+        return session
+
+    recorder = TranscriptFetcher(session_factory=recording_session)
+    recorded = recorder.fetch("abc123")
+    recorder.close()
+
+    replayer = TranscriptFetcher(retries=0, session_factory=lambda: ReplaySession(path))
+    replayed = replayer.fetch("abc123")
+    replayer.close()
+    assert [(s.start, s.text) for s in replayed] == [(0.5, "hello & welcome"), (61.0, "second line")]
+    assert [(s.start, s.text) for s in replayed] == [(s.start, s.text) for s in recorded]
+    assert transcript_extractor.clean_transcript(replayed) == "[00:00] hello welcome [01:01] second line"
@@ -0,0 +1,268 @@
+"""Lightweight per-request tracing with OTLP-compatible JSON export and profiling hooks."""
+import contextlib
+import contextvars
+import cProfile
+import functools
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from results import dumps
+
+SERVICE_NAME = "yt_summarizer"
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+# cProfile can only have one active profiler per process in recent Pythons
+_profile_lock = threading.Lock()
+
+
+class Trace:
+    """All spans of one pipeline invocation; exported once, after the root and every other span have ended."""
+    __slots__ = ("trace_id", "spans", "open_spans", "root_ended", "exported", "sink", "lock")
+
+    def __init__(self, sink=None):
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self.open_spans = 0
+        self.root_ended = False
+        self.exported = False
+        self.sink = sink
+        self.lock = threading.Lock()
+
+
+class Span:
+    """A timed operation with attributes, nested under a parent span."""
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    @property
+    def trace_id(self):
+        return self.trace.trace_id
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        """Increment a numeric attribute (e.g. retries, tokens)."""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Stand-in used outside any trace so callers never need to check."""
+    trace_id = None
+
+    def set_attribute(self, key, value):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def current_span():
+    """Return the active span, or a no-op span outside a trace."""
+    return _current_span.get() or NOOP_SPAN
+
+
+def _begin(trace, name, parent_id, attributes):
+    span = Span(trace, name, parent_id, attributes)
+    with trace.lock:
+        trace.spans.append(span)
+        trace.open_spans += 1
+    return span
+
+
+def _end(span, error=None):
+    span.end_ns = time.time_ns()
+    if error is not None:
+        span.error = f"{type(error).__name__}: {error}"
+    trace = span.trace
+    with trace.lock:
+        trace.open_spans -= 1
+        if span.parent_id is None:
+            trace.root_ended = True
+        # Spans still open after the root (queued scheduler jobs) delay the export
+        finished = trace.root_ended and trace.open_spans == 0 and not trace.exported
+        if finished:
+            trace.exported = True
+    if finished and trace.sink:
+        export(trace)
+
+
+@contextlib.contextmanager
+def start_trace(name, sink=None, **attributes):
+    """
+    Start a new trace with a root span.
+
+    Args:
+        name: Root span name
+        sink: JSON-lines file to export to (default TRACE_FILE env, none if unset)
+        **attributes: Root span attributes
+
+    Yields:
+        Root Span; its trace_id identifies the invocation
+    """
+    trace = Trace(sink or os.getenv('TRACE_FILE'))
+    span = _begin(trace, name, None, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        _end(span, e)
+        raise
+    else:
+        _end(span)
+    finally:
+        _current_span.reset(token)
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Record a child span of the active span; a no-op outside a trace."""
+    parent = _current_span.get()
+    if parent is None:
+        yield NOOP_SPAN
+        return
+    child = _begin(parent.trace, name, parent.span_id, attributes)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        _end(child, e)
+        raise
+    else:
+        _end(child)
+    finally:
+        _current_span.reset(token)
+
+
+def open_span(name, **attributes):
+    """
+    Start a child span of the active span that outlives the current block.
+
+    Used for work that finishes on another thread (a scheduler job); the
+    trace is not exported until close_span() ends it.
+
+    Returns:
+        The new Span, or NOOP_SPAN outside a trace
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return _begin(parent.trace, name, parent.span_id, attributes)
+
+
+def close_span(span, error=None):
+    """End a span started with open_span(); ignores NOOP_SPAN."""
+    if span is not NOOP_SPAN:
+        _end(span, error)
+
+
+def traced(name):
+    """Decorator running a pipeline stage in a span, recording any PipelineError code."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name) as active:
+                result = func(*args, **kwargs)
+                error_code = getattr(result, "error_code", None)
+                if error_code:
+                    active.set_attribute("error_code", error_code)
+                return result
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def attach(parent):
+    """Make parent the active span in this thread (for work handed to worker threads)."""
+    if parent is None or parent is NOOP_SPAN:
+        yield
+        return
+    token = _current_span.set(parent)
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+
+
+def export(trace):
+    """Append a trace to its sink as one OTLP/JSON resourceSpans line."""
+    with trace.lock:
+        spans = [s.to_otlp() for s in trace.spans]
+    record = {"resourceSpans": [{
+        "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+        "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+    }]}
+    try:
+        with open(trace.sink, "a", encoding="utf-8") as f:
+            f.write(dumps(record) + "\n")
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def profile(enabled, name):
+    """
+    Profile the block with cProfile when enabled.
+
+    Stats are written to PROFILE_DIR (default ./profiles) as <name>.prof,
+    viewable with snakeviz or converted to a flame graph with flameprof.
+    Only the calling thread is profiled; LLM calls run on scheduler
+    threads and show up as waiting time. Concurrent profile requests are
+    skipped rather than queued.
+    """
+    if not enabled or not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+        directory = Path(os.getenv('PROFILE_DIR', 'profiles'))
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{name}.prof"
+        profiler.dump_stats(str(path))
+        current_span().set_attribute("profile.path", str(path))
+    finally:
+        _profile_lock.release()
@@ -1,7 +1,18 @@
 """Extract and clean YouTube video transcripts."""
+import random
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import requests
 from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound, VideoUnavailable
+from youtube_transcript_api._errors import (
+    TranscriptsDisabled, NoTranscriptFound, VideoUnavailable,
+    CouldNotRetrieveTranscript, YouTubeRequestFailed, RequestBlocked,
+)
+from config import get_fetcher_settings
+from deadline import DeadlineExceeded
+from http_replay import PooledSession, RecordingSession, ReplaySession
 
 
 def extract_video_id(url):
@@ -24,29 +35,156 @@ def validate_youtube_url(url):
     return video_id is not None
 
 
-def fetch_transcript(video_id):
-    """Fetch transcript from YouTube video."""
-    try:
-        api = YouTubeTranscriptApi()
-        transcript_list = api.list(video_id)
-        
-        # Try to get English transcript first
+class TranscriptFetchError(Exception):
+    """Raised when YouTube keeps failing with transient errors after all retries."""
+
+
+class TranscriptFetcher:
+    """
+    Fetch transcripts over reused HTTP sessions, with retries and concurrent prefetch.
+
+    YouTubeTranscriptApi is not thread-safe, so each thread of the fetcher's
+    long-lived pools keeps an API instance and pooled session, reused for
+    every video it fetches. On-demand fetch() calls run on a pool of
+    fetch_workers threads, so callers on short-lived threads (one per web
+    request) never open sessions of their own and do not queue behind
+    prefetches. Prefetches run on a separate pool capped at concurrency;
+    their transcripts are handed over when fetch() is called for the same
+    video, and dropped after prefetch_ttl seconds if it never is.
+    """
+
+    # Failures worth retrying: network errors, HTTP errors and rate limiting
+    TRANSIENT_ERRORS = (requests.RequestException, YouTubeRequestFailed, RequestBlocked)
+
+    def __init__(self, languages=("en",), concurrency=4, retries=3, backoff=0.5,
+                 session_factory=None, max_pending=64, prefetch_ttl=300.0, fetch_workers=32):
+        self.languages = tuple(languages)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_pending = max_pending
+        self.prefetch_ttl = prefetch_ttl
+        self._session_factory = session_factory or (lambda: PooledSession(pool_size=concurrency))
+        self._local = threading.local()
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="prefetch")
+        self._fetch_pool = ThreadPoolExecutor(max_workers=fetch_workers, thread_name_prefix="fetch")
+        self._pending = {}   # video_id -> (future, submitted at)
+        self._lock = threading.Lock()
+
+    def _api(self):
+        """This pool thread's API instance."""
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = YouTubeTranscriptApi(http_client=self._session_factory())
+            self._local.api = api
+        return api
+
+    def _evict(self):
+        """Drop prefetched transcripts nobody asked for within prefetch_ttl (lock held)."""
+        cutoff = time.monotonic() - self.prefetch_ttl
+        for video_id in [v for v, (_, submitted) in self._pending.items() if submitted < cutoff]:
+            future, _ = self._pending.pop(video_id)
+            future.cancel()
+
+    def prefetch(self, video_ids):
+        """Start fetching transcripts in the background for videos that will be needed soon."""
+        with self._lock:
+            self._evict()
+            for video_id in video_ids:
+                if video_id and video_id not in self._pending and len(self._pending) < self.max_pending:
+                    self._pending[video_id] = (self._prefetch_pool.submit(self._fetch, video_id), time.monotonic())
+
+    def fetch(self, video_id, deadline=None):
+        """
+        Fetch a transcript in the preferred languages, falling back to any available one.
+
+        Args:
+            video_id: YouTube video ID
+            deadline: Deadline of the request; retries and waiting stop when it runs out
+
+        Returns:
+            Transcript snippets, or None if the video has no usable transcript
+
+        Raises:
+            TranscriptFetchError: if transient errors persist after all retries
+            DeadlineExceeded: if the deadline runs out first
+        """
+        with self._lock:
+            self._evict()
+            entry = self._pending.pop(video_id, None)
+        future = entry[0] if entry is not None else self._fetch_pool.submit(self._fetch, video_id, deadline)
+        timeout = deadline.remaining() if deadline is not None else None
         try:
-            transcript = transcript_list.find_transcript(['en'])
-        except NoTranscriptFound:
-            # Try any available transcript
-            available = list(transcript_list)
-            if not available:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            raise DeadlineExceeded("Deadline exceeded during fetch") from None
+
+    def _fetch(self, video_id, deadline=None):
+        """Fetch one transcript, retrying transient errors with jittered exponential backoff."""
+        for attempt in range(self.retries + 1):
+            if deadline is not None:
+                deadline.check("fetch")
+            try:
+                transcript_list = self._api().list(video_id)
+                try:
+                    transcript = transcript_list.find_transcript(self.languages)
+                except NoTranscriptFound:
+                    # Try any available transcript
+                    available = list(transcript_list)
+                    if not available:
+                        return None
+                    transcript = available[0]
+                return transcript.fetch()
+            except self.TRANSIENT_ERRORS as e:
+                # Full jitter keeps concurrent fetchers from retrying in lockstep
+                delay = random.uniform(0, self.backoff * 2 ** attempt)
+                remaining = deadline.remaining() if deadline is not None else None
+                if attempt == self.retries or (remaining is not None and delay >= remaining):
+                    raise TranscriptFetchError(f"YouTube request failed after {attempt + 1} attempts: {e}") from e
+                time.sleep(delay)
+            except (VideoUnavailable, TranscriptsDisabled, NoTranscriptFound, CouldNotRetrieveTranscript):
                 return None
-            transcript = available[0]
-        
-        transcript_data = transcript.fetch()
-        return transcript_data
-        
-    except (VideoUnavailable, TranscriptsDisabled, NoTranscriptFound):
-        return None
-    except Exception:
-        return None
+
+    def close(self):
+        self._prefetch_pool.shutdown(wait=False, cancel_futures=True)
+        self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+
+def get_fetcher():
+    """Return the process-wide TranscriptFetcher configured from environment."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            settings = get_fetcher_settings()
+            replay_file = settings.pop("replay_file")
+            record_file = settings.pop("record_file")
+            if replay_file:
+                settings["session_factory"] = lambda: ReplaySession(replay_file)
+            elif record_file:
+                settings["session_factory"] = lambda: RecordingSession(record_file, pool_size=settings["concurrency"])
+            _fetcher = TranscriptFetcher(**settings)
+        return _fetcher
+
+
+def fetch_transcript(video_id, deadline=None):
+    """Fetch transcript from YouTube video."""
+    return get_fetcher().fetch(video_id, deadline)
+
+
+def prefetch_transcripts(urls):
+    """Start fetching transcripts for URLs that will be processed later."""
+    get_fetcher().prefetch([extract_video_id(url) for url in urls])
+
+
+# Per-snippet cleanup patterns, compiled once (clean_transcript runs them on every snippet)
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+EMPTY_BRACKETS_PATTERN = re.compile(r'\[\s*\]')
+MUSIC_NOTES_PATTERN = re.compile(r'♪+')
+DISALLOWED_CHARS_PATTERN = re.compile(r'[^\w\s\.,!?;:\-\[\]()\'"]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
 
 
 def clean_transcript(transcript_data):
@@ -74,17 +212,17 @@ def clean_transcript(transcript_data):
         timestamp = f"[{minutes:02d}:{seconds:02d}]"
         
         # Remove HTML tags
-        text = re.sub(r'<[^>]+>', '', text)
+        text = HTML_TAG_PATTERN.sub('', text)
         
         # Remove empty brackets and musical notation symbols
-        text = re.sub(r'\[\s*\]', '', text)  # Remove empty brackets
-        text = re.sub(r'♪+', '', text)  # Remove musical note symbols
+        text = EMPTY_BRACKETS_PATTERN.sub('', text)  # Remove empty brackets
+        text = MUSIC_NOTES_PATTERN.sub('', text)  # Remove musical note symbols
         
         # Keep more characters including punctuation
-        text = re.sub(r'[^\w\s\.,!?;:\-\[\]()\'"]', '', text)
+        text = DISALLOWED_CHARS_PATTERN.sub('', text)
         
         # Normalize whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
+        text = WHITESPACE_PATTERN.sub(' ', text).strip()
         
         # Skip entries that are just brackets or special characters
         if not text or len(text.strip()) == 0 or text.strip() in ['[]', '[', ']']:
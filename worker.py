@@ -0,0 +1,168 @@
+"""Queue-driven pipeline workers for running stages across processes and hosts."""
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from config import get_queue_url
+from job_queue import open_queue
+from main import prepare_transcript, run_chunk, run_synthesis
+from results import PipelineError, PreparedTranscript, ChunkSummary, Route, dumps
+from tracing import start_trace
+
+STAGES = ("fetch", "map", "reduce")
+
+# Seconds a leased task stays invisible without a heartbeat
+VISIBILITY_TIMEOUT = 120.0
+
+# Seconds between heartbeats (well inside the visibility timeout)
+HEARTBEAT_INTERVAL = 30.0
+
+# Idle sleep when no task is ready
+POLL_INTERVAL = 1.0
+
+
+def submit(queue, url):
+    """Enqueue a URL for processing and return its job ID."""
+    job_id = uuid.uuid4().hex
+    queue.put(job_id, "fetch", {"url": url})
+    return job_id
+
+
+def job_status(queue, job_id):
+    """Return the final result dict, or a status dict while the job is running."""
+    final = queue.get_result(job_id, "final")
+    if final is not None:
+        return final
+    failure = queue.get_failure(job_id)
+    if failure is not None:
+        return PipelineError("unknown_error", f"Job failed: {failure}").to_dict()
+    prepared = queue.get_result(job_id, "prepared")
+    if prepared is None:
+        return {"status": "queued", "job_id": job_id, "stage": "fetch"}
+    done = queue.count_results(job_id, "chunk:")
+    return {"status": "running", "job_id": job_id, "stage": "map",
+            "chunks_done": done, "chunks_count": len(prepared["chunks"])}
+
+
+def handle_fetch(queue, job_id, payload):
+    """Fetch, clean and chunk; fan out one map task per chunk."""
+    prepared = prepare_transcript(payload["url"])
+    if isinstance(prepared, PipelineError):
+        queue.set_result(job_id, "final", prepared.to_dict())
+        return
+    queue.set_result(job_id, "prepared", prepared.to_dict())
+    for position, chunk in enumerate(prepared.chunks):
+        payload = {"position": position, "chunk": chunk, "chunks_count": len(prepared.chunks),
+                   "route": prepared.routes["map"].to_dict()}
+        queue.put(job_id, "map", payload, key=str(position))
+
+
+def handle_map(queue, job_id, payload):
+    """Summarize one chunk; enqueue the reduce task once every chunk is in."""
+    if queue.get_result(job_id, "final") is not None:
+        return  # Job already failed elsewhere
+    route = Route.from_dict(payload["route"]) if "route" in payload else None
+    summary = run_chunk(payload["chunk"], route=route)
+    if isinstance(summary, PipelineError):
+        queue.set_result(job_id, "final", summary.to_dict())
+        return
+    queue.set_result(job_id, f"chunk:{payload['position']:06d}", summary.to_dict())
+
+    if queue.count_results(job_id, "chunk:") == payload["chunks_count"]:
+        # Duplicate puts from racing map workers are ignored by the queue
+        queue.put(job_id, "reduce", {})
+
+
+def handle_reduce(queue, job_id, payload):
+    """Synthesize the stored chunk summaries into the final result."""
+    if queue.get_result(job_id, "final") is not None:
+        return
+    prepared = PreparedTranscript.from_dict(queue.get_result(job_id, "prepared"))
+    stored = queue.get_results(job_id, "chunk:")
+    summaries = [ChunkSummary.from_dict(stored[key]) for key in sorted(stored)]
+    result = run_synthesis(prepared, summaries)
+    queue.set_result(job_id, "final", result.to_dict())
+
+
+HANDLERS = {"fetch": handle_fetch, "map": handle_map, "reduce": handle_reduce}
+
+
+def _heartbeat(queue, lease, stop):
+    """Keep a lease alive while its task runs."""
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        if not queue.heartbeat(lease, VISIBILITY_TIMEOUT):
+            return
+
+
+def work(queue, stages, worker_id, once=False):
+    """
+    Lease and run tasks for the given stages until interrupted.
+
+    A crashed worker stops heartbeating, so its lease expires after
+    VISIBILITY_TIMEOUT and the task is re-delivered to another worker.
+    """
+    while True:
+        lease = queue.lease(stages, worker_id, VISIBILITY_TIMEOUT)
+        if lease is None:
+            if once:
+                return
+            time.sleep(POLL_INTERVAL)
+            continue
+
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(queue, lease, stop), daemon=True)
+        beat.start()
+        try:
+            with start_trace(f"worker.{lease.stage}", job_id=lease.job_id, attempt=lease.attempts):
+                HANDLERS[lease.stage](queue, lease.job_id, lease.payload)
+        except Exception as e:
+            if not queue.nack(lease, e):
+                queue.set_result(lease.job_id, "final", PipelineError(
+                    "unknown_error", f"Stage {lease.stage} failed: {str(e)}").to_dict())
+        else:
+            queue.ack(lease)
+        finally:
+            stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="YouTube Summarizer queue worker")
+    parser.add_argument("--queue", default=get_queue_url(), help="Queue URL (default: JOB_QUEUE_URL or sqlite:///jobs.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run a worker pool")
+    run_parser.add_argument("--stage", action="append", choices=STAGES,
+                            help="Stage to serve (repeatable; default: all)")
+    run_parser.add_argument("--concurrency", type=int, default=1, help="Worker threads in this process")
+    run_parser.add_argument("--once", action="store_true", help="Exit when no task is ready")
+
+    submit_parser = commands.add_parser("submit", help="Enqueue YouTube URLs")
+    submit_parser.add_argument("urls", nargs="+")
+
+    result_parser = commands.add_parser("result", help="Show a job's status or final JSON")
+    result_parser.add_argument("job_id")
+
+    args = parser.parse_args(argv)
+    queue = open_queue(args.queue)
+
+    if args.command == "submit":
+        for url in args.urls:
+            print(submit(queue, url))
+    elif args.command == "result":
+        print(dumps(job_status(queue, args.job_id), indent=True))
+    else:
+        stages = tuple(args.stage or STAGES)
+        host = f"{socket.gethostname()}:{os.getpid()}"
+        threads = [threading.Thread(target=work, args=(queue, stages, f"{host}:{i}", args.once))
+                   for i in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+if __name__ == "__main__":
+    sys.exit(main())